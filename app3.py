@@ -1,428 +1,35 @@
 import dash
-from dash import dcc, html
-from dash.dependencies import Input, Output
+from dash import dcc, html, DiskcacheManager
+from dash.dependencies import Input, Output, State
 import dash_bootstrap_components as dbc
+import diskcache
+import json
 import plotly.express as px
-import timeit
 import pandas as pd
-from pymongo import MongoClient
-import sqlalchemy
-from sqlalchemy import text
-import json
 import plotly.graph_objs as go
 from plotly.subplots import make_subplots
+from medbase.stats import STATS
+from medbase.profiling import PHASES
+from medbase.results_store import ResultsStore, new_run_id, variant_key
+from medbase.tester import DatabaseTester, RESULTS_STORE_PATH
 
-class DatabaseTester:
-    def __init__(self):
-        self.setup_databases()
-
-    def setup_databases(self):
-        self.mongo_client = MongoClient("mongodb://localhost:27017/")
-        self.mongo_db = self.mongo_client["heart_disease_db"]
-        self.mongo_collection = self.mongo_db["patients"]
-
-        self.pg_engine = sqlalchemy.create_engine("postgresql://postgres@localhost:5432/db_heart_disease")
-
-    def load_data_from_csv(self, filepath):
-        data = pd.read_csv(filepath)
-        return data.to_dict('records')
-    
-    def load_data_from_json(self, filepath):
-        with open(filepath) as json_file:
-            data1 = json.load(json_file)
-        return data1
-
-    # MongoDB  
-
-    def get_max_patient_id_mongo(self):
-        last_record = self.mongo_collection.find_one(sort=[("patient_id", -1)])
-        return last_record['patient_id'] if last_record else 0
-    
-    def insert_mongo_from_file(self, data1, num_records):
-        max_patient_id = self.get_max_patient_id_mongo()
-
-        for i, record in enumerate(data1[:num_records]):
-            
-            if 'sex' not in record:  
-                continue  
-            
-            patient_document = {
-                "patient_id": max_patient_id + i + 1,
-                "demographics": {
-                    "sex": int(record['sex']),
-                    "age": record['age'],
-                    "education": int(record['education']),
-                    "income": int(record['income'])
-                },
-                "health_status": {
-                    "gen_health": int(record['genhlth']),
-                    "ment_health_days": int(record['menthlth']),
-                    "phys_health_days": int(record['physhlth']),
-                    "difficulty_walking": bool(record['diffwalk'])
-                },
-                "lifestyle": {
-                    "physical_activity": bool(record['phys_activity']),
-                    "smoker": bool(record['smoker']),
-                    "fruits": bool(record['fruits']),
-                    "veggies": bool(record['veggies'])
-                },
-                "diseases": {
-                    "heart_disease": bool(record['heartdiseaseorattack']),
-                    "stroke": bool(record['stroke']),
-                    "diabetes": bool(record['diabetes']),
-                    "high_blood_pressure": bool(record['highbp']),
-                    "high_cholesterol": bool(record['highchol'])
-                }
-            }
-            self.mongo_collection.insert_one(patient_document)
-
-    def read_mongo(self, limit):
-        result = list(self.mongo_collection.find().limit(limit))
-        return result
-    
-    def update_mongo(self, num_records):
-    # Pobierz losowe dokumenty do aktualizacji
-        patient_ids = [doc['patient_id'] for doc in self.mongo_collection.aggregate([{"$sample": {"size": num_records}}])]
-        
-        for patient_id in patient_ids:
-            # Zwiększ pole 'income' o 1 dla każdego pacjenta
-            self.mongo_collection.update_one(
-                {"patient_id": patient_id}, 
-                {"$inc": {"demographics.income": 1}}
-            )
 
-    
-    def delete_mongo(self, num_records):
-        patient_ids = [doc['patient_id'] for doc in self.mongo_collection.aggregate([{"$sample": {"size": num_records}}])]
-
-        self.mongo_collection.delete_many({"patient_id": {"$in": patient_ids}})
-
-    # licz pacjentów z wysokim cholesterolem i nadciśnieniem, pogrupowane według wykształcenia i z obliczeniem średniego wieku i dochodu.
-    def complex_query_mongo_1(self, num_records):
-        pipeline = [
-            {"$match": {
-                "diseases.high_cholesterol": True,
-                "diseases.high_blood_pressure": True
-            }},
-            {"$group": {
-                "_id": "$demographics.education",
-                "average_age": {"$avg": "$demographics.age"},
-                "average_income": {"$avg": "$demographics.income"},
-                "patient_count": {"$sum": 1}
-            }},
-            {"$sort": {"average_income": -1}},
-            {"$limit": num_records}
-        ]
-        
-        result = list(self.mongo_collection.aggregate(pipeline))
-        return result
-
-
-
-    def complex_query_mongo_2(self, num_records):
-        # Obliczamy średni dochód pacjentów
-        avg_income_pipeline = [
-            {"$group": {
-                "_id": None,
-                "average_income": {"$avg": "$demographics.income"}
-            }}
-        ]
-        avg_income_result = list(self.mongo_collection.aggregate(avg_income_pipeline))
-        avg_income = avg_income_result[0]['average_income'] if avg_income_result else 0
-
-        # Główne zapytanie
-        pipeline = [
-            {"$match": {
-                "demographics.income": {"$gt": avg_income}
-            }},
-            {"$group": {
-                "_id": "$demographics.education",
-                "average_income": {"$avg": "$demographics.income"},
-                "patient_count": {"$sum": 1}
-            }},
-            {"$match": {
-                "patient_count": {"$gt": 5},
-                "average_income": {"$gt": 50000}
-            }},
-            {"$sort": {"average_income": -1}},
-            {"$limit": num_records}
-        ]
-
-        result = list(self.mongo_collection.aggregate(pipeline))
-        return result
-
-
-
-    # PostgreSQL
-    
-    def get_max_patient_id_pg(self):
-        connection = self.pg_engine.connect()
-        query = text("SELECT MAX(patient_id) FROM patients")  
-        result = connection.execute(query).fetchone()
-        connection.close()
-        
-        return result[0] if result[0] is not None else 0
-
-    def insert_postgresql_from_file(self, data, num_records):
-        max_patient_id = self.get_max_patient_id_pg()
-        connection = self.pg_engine.connect()
-
-        patients_query = text("""
-            INSERT INTO patients (patient_id, sex, age, education, income)
-            VALUES (:patient_id, :sex, :age, :education, :income)
-        """)
-        
-        lifestyle_query = text("""
-            INSERT INTO lifestyle (patient_id, smoker, physical_activity, fruits, veggies)
-            VALUES (:patient_id, :smoker, :physical_activity, :fruits, :veggies)
-        """)
-
-        health_status_query = text("""
-            INSERT INTO health_status (patient_id, gen_health, ment_health_days, phys_health_days, difficulty_walking)
-            VALUES (:patient_id, :gen_health, :ment_health_days, :phys_health_days, :difficulty_walking)
-        """)
-
-        diseases_query = text("""
-            INSERT INTO diseases (patient_id, heart_disease, stroke, diabetes, high_blood_pressure, high_cholesterol)
-            VALUES (:patient_id, :heart_disease, :stroke, :diabetes, :high_blood_pressure, :high_cholesterol)
-        """)
-
-        for i, record in enumerate(data[:num_records]):
-
-            patient_id = max_patient_id + i + 1
-
-            connection.execute(patients_query, {
-                "patient_id": patient_id,
-                "sex": record['Sex'],
-                "age": record['Age'],
-                "education": record['Education'],
-                "income": record['Income']
-            })
-
-            connection.execute(lifestyle_query, {
-                "patient_id": patient_id,
-                "smoker": bool(record['Smoker']),
-                "physical_activity": bool(record['PhysActivity']),
-                "fruits": bool(record['Fruits']),
-                "veggies": bool(record['Veggies'])
-            })
-
-            connection.execute(health_status_query, {
-                "patient_id": patient_id,
-                "gen_health": record['GenHlth'],
-                "ment_health_days": record['MentHlth'],
-                "phys_health_days": record['PhysHlth'],
-                "difficulty_walking": bool(record['DiffWalk'])
-            })
-
-            connection.execute(diseases_query, {
-                "patient_id": patient_id,
-                "heart_disease": bool(record['HeartDiseaseorAttack']),
-                "stroke": bool(record['Stroke']),
-                "diabetes": bool(record['Diabetes']),
-                "high_blood_pressure": bool(record['HighBP']),
-                "high_cholesterol": bool(record['HighChol'])
-            })
-
-        connection.close()
-
-    def read_postgresql(self, limit):
-        connection = self.pg_engine.connect()
-
-        query = text("""
-            SELECT p.patient_id, p.sex, p.age, p.education, p.income,
-                   l.smoker, l.physical_activity, l.fruits, l.veggies,
-                   h.gen_health, h.ment_health_days, h.phys_health_days, h.difficulty_walking,
-                   d.heart_disease, d.stroke, d.diabetes, d.high_blood_pressure, d.high_cholesterol
-            FROM patients p
-            JOIN lifestyle l ON p.patient_id = l.patient_id
-            JOIN health_status h ON p.patient_id = h.patient_id
-            JOIN diseases d ON p.patient_id = d.patient_id
-            LIMIT :limit
-        """)
-
-        result = connection.execute(query, {'limit': limit}).fetchall()
-        connection.close()
-        return result
-    
-    def update_postgresql(self, patient_ids):
-        connection = self.pg_engine.connect()
-
-        patients_query = text("""
-            UPDATE patients SET income = income + 1
-            WHERE patient_id = ANY(:patient_ids)
-        """)
-
-        connection.execute(patients_query, {'patient_ids': patient_ids})
-        connection.close()
-
-    def delete_postgresql(self, num_records):
-        connection = self.pg_engine.connect()
-
-        query = text("SELECT patient_id FROM patients ORDER BY RANDOM() LIMIT :limit")
-        patient_ids = [row[0] for row in connection.execute(query, {'limit': num_records})]
-
-        connection.execute(text("DELETE FROM lifestyle WHERE patient_id = ANY(:patient_ids)"), {'patient_ids': patient_ids})
-        connection.execute(text("DELETE FROM health_status WHERE patient_id = ANY(:patient_ids)"), {'patient_ids': patient_ids})
-        connection.execute(text("DELETE FROM diseases WHERE patient_id = ANY(:patient_ids)"), {'patient_ids': patient_ids})
-        connection.execute(text("DELETE FROM patients WHERE patient_id = ANY(:patient_ids)"), {'patient_ids': patient_ids})
-
-        connection.close()
-
-    def complex_query_postgresql_1(self, num_records):
-        connection = self.pg_engine.connect()
-
-        query = text("""
-            SELECT p.education, 
-                COUNT(p.patient_id) AS patient_count, 
-                AVG(p.age) AS average_age, 
-                AVG(p.income) AS average_income
-            FROM patients p
-            JOIN diseases d ON p.patient_id = d.patient_id
-            WHERE d.high_cholesterol = TRUE 
-            AND d.high_blood_pressure = TRUE
-            GROUP BY p.education
-            ORDER BY average_income DESC
-            LIMIT :num_records;
-        """)
-
-        result = connection.execute(query, {'num_records': num_records}).fetchall()
-        connection.close()
-        return result
-
-
-
-    def complex_query_postgresql_2(self, num_records):
-        connection = self.pg_engine.connect()
-
-        query = text("""
-            WITH avg_income AS (
-                SELECT AVG(income) AS avg_income
-                FROM patients
-            ),
-            filtered_patients AS (
-                SELECT p.education, 
-                    AVG(p.income) AS average_income, 
-                    COUNT(p.patient_id) AS patient_count
-                FROM patients p
-                JOIN avg_income ai ON p.income > ai.avg_income
-                GROUP BY p.education
-            )
-            SELECT education, average_income, patient_count
-            FROM filtered_patients
-            WHERE patient_count > 5 
-            AND average_income > 50000
-            ORDER BY average_income DESC
-            LIMIT :num_records;
-        """)
-
-        result = connection.execute(query, {'num_records': num_records}).fetchall()
-        connection.close()
-        return result
-
-
-
-    # TESTS
-    def run_tests(self, num_iterations=1):
-        data_sizes = [10, 100, 1000, 10000]
-        results = []
-
-        csv_file = 'modified_heart_disease_health_indicators.csv'
-        json_file = 'patients_data.json'
-
-        csv_data = self.load_data_from_csv(csv_file)
-        json_data = self.load_data_from_json(json_file)
-
-        for size in data_sizes:
-            pg_times = {'insert': [], 'read': [], 'update': [], 'delete': [], 'complex_query_1': [], 'complex_query_2': []}
-            mongo_times = {'insert': [], 'read': [], 'update': [], 'delete': [], 'complex_query_1': [], 'complex_query_2': []}
-
-            for _ in range(num_iterations):
-                #MongoDB
-                start_time = timeit.default_timer()
-                self.insert_mongo_from_file(json_data, size)
-                mongo_times['insert'].append(timeit.default_timer() - start_time)
-
-                start_time = timeit.default_timer()
-                self.read_mongo(size)
-                mongo_times['read'].append(timeit.default_timer() - start_time)
-
-                start_time = timeit.default_timer()
-                self.update_mongo(size)
-                mongo_times['update'].append(timeit.default_timer() - start_time)
-
-                start_time = timeit.default_timer()
-                self.delete_mongo(size)
-                mongo_times['delete'].append(timeit.default_timer() - start_time)
-
-                start_time = timeit.default_timer()
-                self.complex_query_mongo_1(size)
-                pg_times['complex_query_1'].append(timeit.default_timer() - start_time)
-
-                start_time = timeit.default_timer()
-                self.complex_query_mongo_2(size)
-                pg_times['complex_query_2'].append(timeit.default_timer() - start_time)
-
-                #PostgreSQL
-                start_time = timeit.default_timer()
-                self.insert_postgresql_from_file(csv_data, size)
-                pg_times['insert'].append(timeit.default_timer() - start_time)
-
-                start_time = timeit.default_timer()
-                rows = self.read_postgresql(size)
-                pg_times['read'].append(timeit.default_timer() - start_time)
-
-                start_time = timeit.default_timer()
-                self.update_postgresql([row[0] for row in rows])
-                pg_times['update'].append(timeit.default_timer() - start_time)
-
-                start_time = timeit.default_timer()
-                self.delete_postgresql(size)
-                pg_times['delete'].append(timeit.default_timer() - start_time)
-
-                start_time = timeit.default_timer()
-                self.complex_query_postgresql_1(size)
-                pg_times['complex_query_1'].append(timeit.default_timer() - start_time)  
-
-                start_time = timeit.default_timer()
-                self.complex_query_postgresql_2(size)
-                pg_times['complex_query_2'].append(timeit.default_timer() - start_time)      
-
-            # Zapisz wyniki dla obu baz danych
-            results.append({
-                "size": size,
-                "mongo_insert_avg": sum(mongo_times['insert']) / num_iterations,
-                "mongo_read_avg": sum(mongo_times['read']) / num_iterations,
-                "mongo_update_avg": sum(mongo_times['update']) / num_iterations,
-                "mongo_delete_avg": sum(mongo_times['delete']) / num_iterations,
-                "mongo_complex_query_1_avg": sum(mongo_times['complex_query_1']) / num_iterations,
-                "mongo_complex_query_2_avg": sum(mongo_times['complex_query_2']) / num_iterations,
-                "pg_insert_avg": sum(pg_times['insert']) / num_iterations,
-                "pg_read_avg": sum(pg_times['read']) / num_iterations,
-                "pg_update_avg": sum(pg_times['update']) / num_iterations,
-                "pg_delete_avg": sum(pg_times['delete']) / num_iterations,
-                "pg_complex_query_1_avg": sum(pg_times['complex_query_1']) / num_iterations,
-                "pg_complex_query_2_avg": sum(pg_times['complex_query_2']) / num_iterations,
-
-            })
-
-        # Zapis wyników do pliku CSV
-        self.save_results(results)
-
-        return results
+# Siatka rozmiarów do wyboru w interfejsie (powyżej 10 000 wierszy - dane syntetyczne)
+DATA_SIZE_OPTIONS = [10, 100, 1000, 10000, 100000, 1000000, 10000000]
 
+# Rodzaje uruchomień w historii: (etykieta, znaczenie kolumny size) - medbase.results_store.RUN_KINDS
+HISTORY_KINDS = {
+    'benchmark': ("CRUD benchmark", "Data size"),
+    'load': ("Load test", "Records per operation"),
+    'pagination': ("Pagination", "Page"),
+}
 
-    def save_results(self, results):
-        df = pd.DataFrame(results)
-         # Dodanie aktualnej daty do nazwy pliku
-        date_str = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        filename = f'crud_performance_results_{date_str}.csv'
-        
-        df.to_csv(filename, index=False)
+# Testy działają poza wątkiem żądania HTTP, w osobnych procesach (background callbacks);
+# stan zadań, postęp i anulowanie przechodzą przez lokalny diskcache
+background_callback_manager = DiskcacheManager(diskcache.Cache('./cache'))
 
-tester = DatabaseTester()
-
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP],
+                background_callback_manager=background_callback_manager)
 
 app.layout = dbc.Container([
     dbc.Row([
@@ -431,6 +38,51 @@ app.layout = dbc.Container([
     dbc.Row([
         dbc.Col([
             dbc.Button("Run tests", id="run-tests", color="primary", className="me-2"),
+            dbc.Button("Cancel", id="cancel-tests", color="danger", className="me-2", disabled=True),
+            dcc.Checklist(
+                id='index-modes',
+                options=[{'label': ' Indexed', 'value': 'indexed'}, {'label': ' Unindexed', 'value': 'unindexed'}],
+                value=['indexed'],
+                inline=True,
+                inputStyle={"margin-left": "10px"},
+                style={"margin-top": "10px"}
+            ),
+            dcc.Checklist(
+                id='aggregate-modes',
+                options=[{'label': ' Ad hoc aggregates', 'value': 'adhoc'}, {'label': ' Precomputed aggregates', 'value': 'precomputed'}],
+                value=['adhoc'],
+                inline=True,
+                inputStyle={"margin-left": "10px"},
+                style={"margin-top": "10px"}
+            ),
+            dcc.Checklist(
+                id='data-sizes',
+                options=[{'label': f' {size:,}', 'value': size} for size in DATA_SIZE_OPTIONS],
+                value=list(DatabaseTester.DEFAULT_DATA_SIZES),
+                inline=True,
+                inputStyle={"margin-left": "10px"},
+                style={"margin-top": "10px"}
+            ),
+            dcc.RadioItems(
+                id='data-source',
+                options=[{'label': ' Data files', 'value': 'files'}, {'label': ' Synthetic', 'value': 'synthetic'}],
+                value='files',
+                inline=True,
+                inputStyle={"margin-left": "10px"},
+                style={"margin-top": "10px"}
+            ),
+            dcc.Checklist(
+                id='instrument',
+                options=[{'label': ' Server counters', 'value': 'counters'}, {'label': ' Query plans (EXPLAIN)', 'value': 'explain'},
+                         {'label': ' Phase breakdown', 'value': 'phases'}],
+                value=[],
+                inline=True,
+                inputStyle={"margin-left": "10px"},
+                style={"margin-top": "10px"}
+            ),
+            dbc.Progress(id="run-progress", value=0, label="", style={"margin-top": "10px", "height": "20px"}),
+            dcc.Store(id='run-store'),
+            dcc.Store(id='partial-store'),
             html.Div(id="loading-output", style={"margin-top": "10px"})
         ], width=12, className="text-center mb-4")
     ]),
@@ -481,155 +133,552 @@ app.layout = dbc.Container([
                 children=dcc.Graph(id='complex-query-2-chart')
             )
         ], width=6)
+    ]),
+    dbc.Row([
+        dbc.Col([
+            dcc.Loading(
+                id="loading-connect",
+                type="default",
+                children=dcc.Graph(id='connect-chart')
+            )
+        ], width=6),
+        dbc.Col([
+            dcc.Loading(
+                id="loading-read-first-row",
+                type="default",
+                children=dcc.Graph(id='read-first-row-chart')
+            )
+        ], width=6)
+    ]),
+    dbc.Row([
+        dbc.Col([
+            dcc.Loading(
+                id="loading-read-memory",
+                type="default",
+                children=dcc.Graph(id='read-memory-chart')
+            )
+        ], width=6)
+    ]),
+    dbc.Row([
+        dbc.Col([
+            dcc.Graph(id='phase-chart')
+        ], width=12)
+    ]),
+    dbc.Row([
+        dbc.Col([
+            html.H5("Point details"),
+            html.Div("Click a point on a chart to see its query plans, server counters and phases.", id='point-details')
+        ], width=12, className="mb-4")
+    ]),
+    dbc.Row([
+        dbc.Col(html.H4("Concurrent load", className="text-center"), className="mb-2 mt-4")
+    ]),
+    dbc.Row([
+        dbc.Col([
+            dbc.Button("Run load test", id="run-load-test", color="secondary", className="me-2"),
+            dcc.Loading(
+                id="loading-load",
+                type="default",
+                children=[
+                    dcc.Store(id='load-store'),
+                    html.Div(id="load-output", style={"margin-top": "10px"})
+                ]
+            )
+        ], width=12, className="text-center mb-4")
+    ]),
+    dbc.Row([
+        dbc.Col([
+            dcc.Graph(id='load-throughput-chart')
+        ], width=6),
+        dbc.Col([
+            dcc.Graph(id='load-latency-chart')
+        ], width=6)
+    ]),
+    dbc.Row([
+        dbc.Col(html.H4("Pagination", className="text-center"), className="mb-2 mt-4")
+    ]),
+    dbc.Row([
+        dbc.Col([
+            dbc.Button("Run pagination test", id="run-pagination-test", color="secondary", className="me-2"),
+            dcc.Loading(
+                id="loading-pagination",
+                type="default",
+                children=[
+                    dcc.Store(id='pagination-store'),
+                    html.Div(id="pagination-output", style={"margin-top": "10px"})
+                ]
+            )
+        ], width=12, className="text-center mb-4")
+    ]),
+    dbc.Row([
+        dbc.Col([
+            dcc.Graph(id='pagination-chart')
+        ], width=12)
+    ]),
+    dbc.Row([
+        dbc.Col(html.H4("History", className="text-center"), className="mb-2 mt-4")
+    ]),
+    dbc.Row([
+        dbc.Col([
+            dbc.Button("Refresh history", id="refresh-history", color="secondary", className="me-2")
+        ], width=3),
+        dbc.Col([
+            dcc.RadioItems(
+                id='history-kind',
+                options=[{'label': f' {label}', 'value': kind} for kind, (label, _) in HISTORY_KINDS.items()],
+                value='benchmark',
+                inline=True,
+                inputStyle={"margin-left": "10px"}
+            )
+        ], width=9)
+    ], className="mb-2"),
+    dbc.Row([
+        dbc.Col([
+            dcc.Dropdown(id='history-operation', placeholder="Operation")
+        ], width=4),
+        dbc.Col([
+            dcc.Dropdown(id='history-size', placeholder="Data size")
+        ], width=4),
+        dbc.Col([
+            dcc.Dropdown(id='history-stat', options=[{'label': stat, 'value': stat} for stat in STATS], value='avg',
+                         clearable=False)
+        ], width=4)
+    ], className="mb-2"),
+    dbc.Row([
+        dbc.Col([
+            dcc.Graph(id='history-chart')
+        ], width=12)
+    ]),
+    dbc.Row([
+        dbc.Col([
+            html.H5("Latest run vs previous runs"),
+            html.Div(id='regression-table')
+        ], width=12, className="mb-4")
     ])
 ], fluid=True)
 
 
+CHARTS = [
+    ('insert-performance-chart', 'insert', 'Insert', 'Insert Time'),
+    ('read-performance-chart', 'read', 'Read', 'Read Time'),
+    ('update-performance-chart', 'update', 'Update', 'Update Time'),
+    ('delete-performance-chart', 'delete', 'Delete', 'Delete Time'),
+    ('complex-query-1-chart', 'complex_query_1', 'Complex Query 1', 'Complex Query 1'),
+    ('complex-query-2-chart', 'complex_query_2', 'Complex Query 2', 'Complex Query 2'),
+    ('connect-chart', 'connect', 'Connection Acquire', 'Connection Acquire Time'),
+    ('read-first-row-chart', 'first_row_read', 'Time to First Row', 'Read: Time to First Row'),
+    ('read-memory-chart', 'peak_rss_read', 'Peak RSS', 'Read: Peak RSS Growth'),
+]
 
+# Oś Y i jednostka serii, które nie są czasami: (tytuł osi, jednostka, typ osi)
+CHART_UNITS = {
+    'peak_rss_read': ("Peak RSS growth (MB)", 'MB', 'linear'),
+}
 
-import datetime
+# Nazwy wyświetlane znanych baz; inne bazy z rejestru operacji pokazywane są pod swoim przedrostkiem
+BACKEND_NAMES = {'pg': 'PostgreSQL', 'mongo': 'MongoDB'}
 
-@app.callback(
-    Output('insert-performance-chart', 'figure'),
-    [Input('run-tests', 'n_clicks')]
-)
-def update_insert_chart(n_clicks):
-    if n_clicks is None:
-        raise dash.exceptions.PreventUpdate
+# Bazy obecne w wynikach (przedrostki kolumn <baza>_<operacja>_avg), znane najpierw
+def result_backends(columns):
+    found = dict.fromkeys(column.partition('_')[0] for column in columns if '_' in column and column.endswith('_avg'))
+    return [backend for backend in BACKEND_NAMES if backend in found] + [backend for backend in found if backend not in BACKEND_NAMES]
 
-    results = tester.run_tests()
-    df = pd.DataFrame(results)
+# Wymiary uruchomienia - każda kombinacja wartości dostaje osobne serie
+VARIANT_COLUMNS = ['indexes', 'aggregates']
 
-    fig = go.Figure()
+COLORS = px.colors.qualitative.Plotly
+
+def hex_to_rgba(color, alpha):
+    color = color.lstrip('#')
+    red, green, blue = (int(color[i:i + 2], 16) for i in (0, 2, 4))
+    return f'rgba({red}, {green}, {blue}, {alpha})'
 
-    fig.add_trace(go.Scatter(x=df['size'], y=df['pg_insert_avg'], mode='lines+markers', name='PostgreSQL Insert'))
-    fig.add_trace(go.Scatter(x=df['size'], y=df['mongo_insert_avg'], mode='lines+markers', name='MongoDB Insert'))
+def build_chart(results, operation, label, title):
+    yaxis_title, unit, yaxis_type = CHART_UNITS.get(operation, ("Time (s)", 's', 'log'))
+    df = pd.DataFrame(results)
+    variant_columns = [column for column in VARIANT_COLUMNS if column in df.columns and df[column].nunique() > 1]
+    variants = df.groupby(variant_columns, sort=False) if variant_columns else [((), df)]
 
+    fig = go.Figure()
+    trace_count = 0
+
+    for variant, subset in variants:
+        variant = variant if isinstance(variant, tuple) else (variant,)
+        suffix = f' [{", ".join(map(str, variant))}]' if variant else ''
+        dashed = 'unindexed' in variant
+
+        # Jedna seria na każdą strategię, np. mongo_insert_bulk_avg -> "MongoDB Insert (bulk)"
+        for prefix in result_backends(subset.columns):
+            backend = BACKEND_NAMES.get(prefix, prefix)
+            base = f'{prefix}_{operation}'
+            for column in subset.columns:
+                if column != f'{base}_avg' and not (column.startswith(f'{base}_') and column.endswith('_avg')):
+                    continue
+                strategy = column[len(base):-len('_avg')].strip('_')
+                name = f'{backend} {label}' + (f' ({strategy.replace("_", " ")})' if strategy else '') + suffix
+                color = COLORS[trace_count % len(COLORS)]
+                trace_count += 1
+
+                # Pasmo 95% przedziału ufności wokół średniej
+                series = column[:-len('_avg')]
+                if f'{series}_ci_low' in subset.columns:
+                    # Na osi logarytmicznej dolna granica nie może zejść do zera - ucinamy ją na minimum serii
+                    ci_low = subset[f'{series}_ci_low']
+                    if f'{series}_min' in subset.columns:
+                        ci_low = ci_low.clip(lower=subset[f'{series}_min'])
+                    fig.add_trace(go.Scatter(
+                        x=list(subset['size']) + list(subset['size'])[::-1],
+                        y=list(subset[f'{series}_ci_high']) + list(ci_low)[::-1],
+                        fill='toself', fillcolor=hex_to_rgba(color, 0.2), line={'color': 'rgba(0, 0, 0, 0)'},
+                        hoverinfo='skip', showlegend=False, legendgroup=name
+                    ))
+
+                line = {'color': color, 'dash': 'dot'} if dashed else {'color': color}
+                statistics = f'{series}_p99' in subset.columns
+                # Po statystykach tożsamość punktu (baza, seria, wariant) - dla panelu szczegółów po kliknięciu
+                point = pd.DataFrame({'backend': prefix, 'operation': series[len(prefix) + 1:],
+                                      'variant': subset.apply(variant_key, axis=1)}, index=subset.index)
+                customdata = pd.concat([subset[[f'{series}_{stat}' for stat in ('median', 'p95', 'p99', 'std', 'outliers')]], point],
+                                       axis=1) if statistics else point
+                fig.add_trace(go.Scatter(
+                    x=subset['size'], y=subset[column], mode='lines+markers', name=name, line=line, legendgroup=name,
+                    customdata=customdata.to_numpy(),
+                    hovertemplate=(f'{name}<br>size=%{{x}}<br>avg=%{{y:.4f}}{unit}<br>median=%{{customdata[0]:.4f}}{unit}'
+                                   f'<br>p95=%{{customdata[1]:.4f}}{unit}<br>p99=%{{customdata[2]:.4f}}{unit}'
+                                   f'<br>std=%{{customdata[3]:.4f}}{unit}<br>outliers=%{{customdata[4]}}<extra></extra>')
+                    if statistics else None
+                ))
+
+    # Rozmiary i czasy rosną o rzędy wielkości - obie osie logarytmiczne
     fig.update_layout(
-        title="Insert Time",
+        title=title,
         xaxis_title="Data Size",
-        yaxis_title="Time (s)"
+        yaxis_title=yaxis_title,
+        xaxis_type="log",
+        yaxis_type=yaxis_type
     )
     return fig
 
+# Jedno kliknięcie = jedno uruchomienie testów w tle; wyniki częściowe po każdej operacji trafiają
+# do partial-store, końcowe do run-store. Anulowanie kończy proces zadania.
+# Każde zadanie tworzy własny DatabaseTester - pule połączeń nie są dzielone między procesami.
 @app.callback(
-    Output('read-performance-chart', 'figure'),
-    [Input('run-tests', 'n_clicks')]
+    [Output('run-store', 'data'),
+     Output('loading-output', 'children')],
+    [Input('run-tests', 'n_clicks')],
+    [State('index-modes', 'value'),
+     State('aggregate-modes', 'value'),
+     State('data-sizes', 'value'),
+     State('data-source', 'value'),
+     State('instrument', 'value')],
+    background=True,
+    running=[
+        (Output('run-tests', 'disabled'), True, False),
+        (Output('cancel-tests', 'disabled'), False, True),
+    ],
+    cancel=[Input('cancel-tests', 'n_clicks')],
+    progress=[Output('run-progress', 'value'), Output('run-progress', 'label'), Output('partial-store', 'data')],
+    prevent_initial_call=True
 )
-def update_read_chart(n_clicks):
+def run_benchmark(set_progress, n_clicks, index_modes, aggregate_modes, data_sizes, data_source, instrument):
     if n_clicks is None:
         raise dash.exceptions.PreventUpdate
 
-    results = tester.run_tests()
-    df = pd.DataFrame(results)
+    run_id = new_run_id()
 
-    fig = go.Figure()
+    def report(progress):
+        label = f"{progress['completed']}/{progress['total']}: size {progress['size']}, {progress['operation']}"
+        set_progress((100 * progress['completed'] / progress['total'], label,
+                      {"run_id": run_id, "results": progress['results']}))
 
-    fig.add_trace(go.Scatter(x=df['size'], y=df['pg_read_avg'], mode='lines+markers', name='PostgreSQL Read'))
-    fig.add_trace(go.Scatter(x=df['size'], y=df['mongo_read_avg'], mode='lines+markers', name='MongoDB Read'))
+    tester = DatabaseTester(instrument=instrument or ())
+    try:
+        results = tester.run_tests(index_modes=index_modes or ['indexed'],
+                                   aggregate_modes=aggregate_modes or ['adhoc'],
+                                   data_sizes=sorted(data_sizes or DatabaseTester.DEFAULT_DATA_SIZES),
+                                   data_source=data_source,
+                                   progress_callback=report,
+                                   run_id=run_id)
+    except ValueError as exc:
+        # Np. rozmiar większy niż plik danych - komunikat zamiast wykresów
+        return dash.no_update, str(exc)
 
-    fig.update_layout(
-        title="Read Time",
-        xaxis_title="Data Size",
-        yaxis_title="Time (s)"
-    )
-    return fig
+    return {"run_id": run_id, "results": results}, f"Run {run_id} finished"
 
+# Wszystkie wykresy rysowane są z tego samego uruchomienia - w trakcie z wyników częściowych
 @app.callback(
-    Output('update-performance-chart', 'figure'),
-    [Input('run-tests', 'n_clicks')]
+    [Output(chart_id, 'figure') for chart_id, _, _, _ in CHARTS],
+    [Input('run-store', 'data'),
+     Input('partial-store', 'data')]
 )
-def update_update_chart(n_clicks):
-    if n_clicks is None:
+def update_charts(run, partial):
+    if dash.ctx.triggered_id == 'partial-store':
+        run = partial
+    if not run or not run['results']:
         raise dash.exceptions.PreventUpdate
 
-    results = tester.run_tests()
-    df = pd.DataFrame(results)
+    return [build_chart(run['results'], operation, label, title) for _, operation, label, title in CHARTS]
 
+# Fazy czasu operacji (tryb 'phases') dla największego rozmiaru: jeden słupek na operację, fazy jeden na drugim
+def build_phase_chart(results):
+    df = pd.DataFrame(results)
+    df = df[df['size'] == df['size'].max()]
+    show_variant = any(df[column].nunique() > 1 for column in VARIANT_COLUMNS if column in df.columns)
     fig = go.Figure()
 
-    fig.add_trace(go.Scatter(x=df['size'], y=df['pg_update_avg'], mode='lines+markers', name='PostgreSQL Update'))
-    fig.add_trace(go.Scatter(x=df['size'], y=df['mongo_update_avg'], mode='lines+markers', name='MongoDB Update'))
+    for phase_index, phase in enumerate(PHASES):
+        labels, values = [], []
+        for _, row in df.iterrows():
+            suffix = f' [{variant_key(row)}]' if show_variant else ''
+            for prefix in result_backends(row.index):
+                marker = f'{prefix}_phase_{phase}_'
+                for column in row.index:
+                    if column.startswith(marker) and column.endswith('_avg') and not pd.isna(row[column]):
+                        labels.append(f'{prefix}:{column[len(marker):-len("_avg")]}{suffix}')
+                        values.append(row[column])
+        if values:
+            fig.add_trace(go.Bar(x=labels, y=values, name=phase, marker_color=COLORS[phase_index % len(COLORS)]))
 
     fig.update_layout(
-       title="Update Time",
-        xaxis_title="Data Size",
-        yaxis_title="Time (s)"
+        title=f"Time by phase (size {df['size'].max():,})" if not df.empty else "Time by phase",
+        xaxis_title="Operation",
+        yaxis_title="Time (s)",
+        barmode='stack'
     )
     return fig
 
 @app.callback(
-    Output('delete-performance-chart', 'figure'),
-    [Input('run-tests', 'n_clicks')]
+    Output('phase-chart', 'figure'),
+    [Input('run-store', 'data')]
+)
+def update_phase_chart(run):
+    if not run or not run['results']:
+        raise dash.exceptions.PreventUpdate
+    return build_phase_chart(run['results'])
+
+def render_query(query):
+    if 'error' in query:
+        return html.Li([html.Code(query['query']), html.Span(f" - {query['error']}", className="text-danger")])
+
+    numbers = ', '.join(f'{name}={query[name]}' for name in
+                        ('execution_ms', 'planning_ms', 'shared_hit', 'shared_read', 'returned', 'keys_examined', 'docs_examined')
+                        if query.get(name) is not None)
+    return html.Li([
+        html.Code(query['query'][:300]),
+        html.Div(' → '.join(query['nodes'])),
+        html.Div(numbers, className="text-muted"),
+        html.Details([html.Summary("Full plan"), html.Pre(json.dumps(query['plan'], indent=2, default=str))])
+    ], className="mb-2")
+
+# Szczegóły klikniętego punktu: plany zapytań i przyrosty liczników serwera z ostatniej iteracji
+@app.callback(
+    Output('point-details', 'children'),
+    [Input(chart_id, 'clickData') for chart_id, _, _, _ in CHARTS],
+    [State('run-store', 'data')],
+    prevent_initial_call=True
+)
+def show_point_details(*args):
+    run = args[-1]
+    click = dash.ctx.triggered[0]['value']
+    if not click or not run:
+        raise dash.exceptions.PreventUpdate
+
+    point = click['points'][0]
+    if 'customdata' not in point:
+        raise dash.exceptions.PreventUpdate
+    backend, operation, variant = point['customdata'][-3:]
+    size = int(point['x'])
+    title = html.H6(f"{backend}:{operation}, size {size:,}" + (f" [{variant}]" if variant else ''))
+
+    details = ResultsStore(RESULTS_STORE_PATH).details(run['run_id'], backend, operation, size, variant)
+    if not details:
+        return [title, html.Div("No instrumentation captured for this point (enable counters / query plans / phases before the run).")]
+
+    children = [title]
+    if 'phases' in details:
+        children.append(dbc.Table.from_dataframe(pd.DataFrame([details['phases']]).round(6), bordered=True, size='sm'))
+    if 'counters' in details:
+        children.append(dbc.Table.from_dataframe(pd.DataFrame([details['counters']]), bordered=True, size='sm'))
+    if 'profile' in details:
+        children.append(html.Div(["Profile: ", html.Code(details['profile'])]))
+    if details.get('queries'):
+        children.append(html.Ul([render_query(query) for query in details['queries']]))
+    return children
+
+
+
+
+@app.callback(
+    [Output('load-store', 'data'),
+     Output('load-output', 'children')],
+    [Input('run-load-test', 'n_clicks')],
+    background=True,
+    running=[(Output('run-load-test', 'disabled'), True, False)],
+    prevent_initial_call=True
 )
-def update_delete_chart(n_clicks):
+def run_load_benchmark(n_clicks):
     if n_clicks is None:
         raise dash.exceptions.PreventUpdate
 
-    results = tester.run_tests()
+    results = DatabaseTester().run_load_tests()
+    errors = sum(row['errors'] for row in results)
+
+    return results, f"Load test finished ({errors} failed operations)"
+
+def build_load_chart(results, column, title, yaxis_title):
     df = pd.DataFrame(results)
 
     fig = go.Figure()
 
-    fig.add_trace(go.Scatter(x=df['size'], y=df['pg_delete_avg'], mode='lines+markers', name='PostgreSQL Delete'))
-    fig.add_trace(go.Scatter(x=df['size'], y=df['mongo_delete_avg'], mode='lines+markers', name='MongoDB Delete'))
+    for (backend, operation), subset in df.groupby(['backend', 'operation'], sort=False):
+        fig.add_trace(go.Scatter(x=subset['concurrency'], y=subset[column], mode='lines+markers',
+                                 name=f'{BACKEND_NAMES.get(backend, backend)} {operation.replace("_", " ")}'))
 
     fig.update_layout(
-        title="Delete Time",
-        xaxis_title="Data Size",
-        yaxis_title="Time (s)"
+        title=title,
+        xaxis_title="Concurrent clients",
+        yaxis_title=yaxis_title
     )
     return fig
 
 @app.callback(
-    Output('complex-query-1-chart', 'figure'),
-    [Input('run-tests', 'n_clicks')]
+    [Output('load-throughput-chart', 'figure'),
+     Output('load-latency-chart', 'figure')],
+    [Input('load-store', 'data')]
 )
-def update_complex_query_1_chart(n_clicks):
+def update_load_charts(results):
+    if not results:
+        raise dash.exceptions.PreventUpdate
+
+    return [
+        build_load_chart(results, 'throughput', "Throughput", "Operations / s"),
+        build_load_chart(results, 'latency_p95', "Latency p95", "Time (s)"),
+    ]
+
+
+@app.callback(
+    [Output('pagination-store', 'data'),
+     Output('pagination-output', 'children')],
+    [Input('run-pagination-test', 'n_clicks')],
+    background=True,
+    running=[(Output('run-pagination-test', 'disabled'), True, False)],
+    prevent_initial_call=True
+)
+def run_pagination_benchmark(n_clicks):
     if n_clicks is None:
         raise dash.exceptions.PreventUpdate
 
-    results = tester.run_tests()
+    results = DatabaseTester().run_pagination_tests()
+    return results, "Pagination test finished"
+
+# Opóźnienie strony w funkcji jej numeru; OFFSET/skip linią kropkowaną
+@app.callback(
+    Output('pagination-chart', 'figure'),
+    [Input('pagination-store', 'data')]
+)
+def update_pagination_chart(results):
+    if not results:
+        raise dash.exceptions.PreventUpdate
+
     df = pd.DataFrame(results)
 
     fig = go.Figure()
-
-    fig.add_trace(go.Scatter(x=df['size'], y=df['pg_complex_query_1_avg'], mode='lines+markers', name='PostgreSQL Complex Query 1'))
-    fig.add_trace(go.Scatter(x=df['size'], y=df['mongo_complex_query_1_avg'], mode='lines+markers', name='MongoDB Complex Query 1'))
+    for (backend, mode), subset in df.groupby(['backend', 'mode'], sort=False):
+        subset = subset.sort_values('page')
+        fig.add_trace(go.Scatter(
+            x=subset['page'], y=subset['latency_avg'], mode='lines+markers', name=f'{BACKEND_NAMES.get(backend, backend)} {mode}',
+            line={'dash': 'dot'} if mode == 'offset' else {},
+            error_y={'type': 'data', 'symmetric': False,
+                     'array': subset['latency_ci_high'] - subset['latency_avg'],
+                     'arrayminus': subset['latency_avg'] - subset['latency_ci_low']}
+        ))
 
     fig.update_layout(
-        title="Complex Query 1",
-        xaxis_title="Data Size",
-        yaxis_title="Time (s)"
+        title=f"Page latency vs depth ({df['page_size'].iloc[0]} rows per page)",
+        xaxis_title="Page number",
+        yaxis_title="Time (s)",
+        xaxis_type="log",
+        yaxis_type="log"
     )
     return fig
 
+
+# Historia: opcje list rozwijanych z magazynu wyników dla wybranego rodzaju uruchomień,
+# odświeżane po każdym uruchomieniu
 @app.callback(
-    Output('complex-query-2-chart', 'figure'),
-    [Input('run-tests', 'n_clicks')]
+    [Output('history-operation', 'options'),
+     Output('history-size', 'options'),
+     Output('history-size', 'placeholder'),
+     Output('history-operation', 'value'),
+     Output('history-size', 'value')],
+    [Input('refresh-history', 'n_clicks'),
+     Input('run-store', 'data'),
+     Input('history-kind', 'value')],
+    [State('history-operation', 'value'),
+     State('history-size', 'value')]
 )
-def update_complex_query_2_chart(n_clicks):
-    if n_clicks is None:
+def update_history_options(n_clicks, run, kind, operation, size):
+    series = ResultsStore(RESULTS_STORE_PATH).operations(kind=kind)
+    operations = sorted(series['operation'].unique())
+    sizes = sorted(series['size'].unique())
+    # Wybór z innego rodzaju uruchomień nie ma tu odpowiednika
+    if dash.ctx.triggered_id == 'history-kind':
+        operation = size = None
+    return ([{'label': operation, 'value': operation} for operation in operations],
+            [{'label': f'{size:,}', 'value': int(size)} for size in sizes],
+            HISTORY_KINDS[kind][1], operation, size)
+
+@app.callback(
+    Output('history-chart', 'figure'),
+    [Input('history-operation', 'value'),
+     Input('history-size', 'value'),
+     Input('history-stat', 'value'),
+     Input('run-store', 'data')],
+    [State('history-kind', 'value')]
+)
+def update_history_chart(operation, size, stat, run, kind):
+    if not operation:
         raise dash.exceptions.PreventUpdate
 
-    results = tester.run_tests()
-    df = pd.DataFrame(results)
+    df = ResultsStore(RESULTS_STORE_PATH).history(operation, size=size, stat=stat, kind=kind)
+    size_label = HISTORY_KINDS[kind][1].lower()
 
     fig = go.Figure()
-
-    fig.add_trace(go.Scatter(x=df['size'], y=df['pg_complex_query_2_avg'], mode='lines+markers', name='PostgreSQL Complex Query 2'))
-    fig.add_trace(go.Scatter(x=df['size'], y=df['mongo_complex_query_2_avg'], mode='lines+markers', name='MongoDB Complex Query 2'))
+    for (backend, series_size, variant), subset in df.groupby(['backend', 'size', 'variant'], sort=False):
+        name = f'{BACKEND_NAMES.get(backend, backend)} {size_label}={series_size:,}' + (f' [{variant}]' if variant else '')
+        fig.add_trace(go.Scatter(
+            x=pd.to_datetime(subset['started_at']), y=subset['value'], mode='lines+markers', name=name,
+            customdata=subset[['run_id', 'git_sha']].fillna('').to_numpy(),
+            hovertemplate=f'{name}<br>%{{y:.4f}}<br>run %{{customdata[0]}}<br>commit %{{customdata[1]:.8}}<extra></extra>'
+        ))
 
     fig.update_layout(
-        title="Complex Query 2",
-        xaxis_title="Data Size",
-        yaxis_title="Time (s)"
+        title=f"{operation} ({stat}) over time",
+        xaxis_title="Run started",
+        yaxis_title="Time (s)",
+        yaxis_type="log"
     )
     return fig
 
+# Regresje i poprawy ostatniego uruchomienia względem mediany poprzednich (ta sama konfiguracja)
+@app.callback(
+    Output('regression-table', 'children'),
+    [Input('refresh-history', 'n_clicks'),
+     Input('run-store', 'data')]
+)
+def update_regression_table(n_clicks, run):
+    compared = ResultsStore(RESULTS_STORE_PATH).regressions()
+    if compared.empty:
+        return "Not enough runs with the same configuration to compare."
 
+    changed = compared[compared['status'] != 'ok'].copy()
+    if changed.empty:
+        return f"Run {compared['run_id'].iloc[0]}: no series changed by more than 20%."
+
+    changed['change'] = (changed['change'] * 100).round(1).astype(str) + '%'
+    changed = changed[['status', 'backend', 'operation', 'size', 'variant', 'value', 'baseline', 'baseline_runs', 'change']]
+    return dbc.Table.from_dataframe(changed.round(4), striped=True, bordered=True, hover=True, size='sm')
 
 
 if __name__ == '__main__':
     app.run_server(debug=True)
-
@@ -0,0 +1,20 @@
+import argparse
+import glob
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from medbase.results_store import ResultsStore
+
+parser = argparse.ArgumentParser()
+# Przeniesienie dotychczasowych plików crud_performance_results_<data>.csv do magazynu historii
+parser.add_argument('files', nargs='*')
+parser.add_argument('--store', default='benchmark_results.sqlite')
+args = parser.parse_args()
+
+store = ResultsStore(args.store)
+files = args.files or sorted(glob.glob('crud_performance_results*.csv'))
+
+imported = [path for path in files if store.import_csv(path) is not None]
+
+print(f"Zaimportowano {len(imported)} z {len(files)} plików do {args.store}.")
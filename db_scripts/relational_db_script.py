@@ -1,31 +1,33 @@
+import argparse
+import os
+import sys
 import pandas as pd
 
-# Wczytaj plik CSV
-data = pd.read_csv('modified_heart_disease_health_indicators.csv')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from medbase.tables import split_patient_tables, write_pg_binary_copy
 
-# Zmniejszenie rozmiaru do 50,000 wierszy
-data = data.head(50000)
+parser = argparse.ArgumentParser()
+# csv - pliki tekstowe jak dotychczas, parquet - typowane kolumny, copy - binarny format COPY PostgreSQL
+parser.add_argument('--format', nargs='+', choices=['csv', 'parquet', 'copy'], default=['csv'])
+parser.add_argument('--output-dir', default='.')
+parser.add_argument('--rows', type=int, default=50000)
+args = parser.parse_args()
 
-# Tworzenie tabeli Pacjenci
-patients_df = data[['Sex', 'Age', 'Education', 'Income']].copy()
-patients_df = patients_df.reset_index().rename(columns={"index": "patient_id"})
+# Wczytaj plik CSV (zmniejszony do --rows wierszy, domyślnie 50,000)
+data = pd.read_csv('modified_heart_disease_health_indicators.csv', nrows=args.rows)
 
-# Tworzenie tabeli Stan Zdrowia
-health_status_df = data[['GenHlth', 'MentHlth', 'PhysHlth', 'DiffWalk']].copy()
-health_status_df = health_status_df.reset_index().rename(columns={"index": "patient_id"})
+# Tabele Pacjenci, Stan Zdrowia, Styl Życia i Choroby z poprawnymi typami (int / bool), w jednym przebiegu
+tables = split_patient_tables(data)
 
-# Tworzenie tabeli Styl Życia
-lifestyle_df = data[['PhysActivity', 'Smoker', 'Fruits', 'Veggies']].copy()
-lifestyle_df = lifestyle_df.reset_index().rename(columns={"index": "patient_id"})
+os.makedirs(args.output_dir, exist_ok=True)
+for table, frame in tables.items():
+    path = os.path.join(args.output_dir, table)
 
-# Tworzenie tabeli Choroby
-diseases_df = data[['HeartDiseaseorAttack', 'Stroke', 'Diabetes', 'HighBP', 'HighChol']].copy()
-diseases_df = diseases_df.reset_index().rename(columns={"index": "patient_id"})
+    if 'csv' in args.format:
+        frame.to_csv(f'{path}.csv', index=False)
+    if 'parquet' in args.format:
+        frame.to_parquet(f'{path}.parquet', index=False)
+    if 'copy' in args.format:
+        write_pg_binary_copy(frame, f'{path}.copy')
 
-# Zapisz tabele do plików CSV
-patients_df.to_csv('patients.csv', index=False)
-health_status_df.to_csv('health_status.csv', index=False)
-lifestyle_df.to_csv('lifestyle.csv', index=False)
-diseases_df.to_csv('diseases.csv', index=False)
-
-print("Dane zostały podzielone i zapisane w plikach CSV.")
+print(f"Dane zostały podzielone i zapisane ({', '.join(args.format)}) w katalogu {args.output_dir}.")
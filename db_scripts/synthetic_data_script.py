@@ -0,0 +1,22 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from medbase.synthetic import SyntheticPatients, load_marginals
+
+parser = argparse.ArgumentParser()
+# Rozkłady kolumn liczone z prawdziwego pliku, potem dowolnie wiele wierszy zapisywanych paczkami
+parser.add_argument('--source', default='modified_heart_disease_health_indicators.csv')
+parser.add_argument('--output', default='synthetic_heart_disease_health_indicators.csv')
+parser.add_argument('--rows', type=int, default=1000000)
+parser.add_argument('--chunk-size', type=int, default=100000)
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+patients = SyntheticPatients(load_marginals(args.source), args.rows, seed=args.seed, chunk_size=args.chunk_size)
+
+for i, frame in enumerate(patients.frames()):
+    frame.to_csv(args.output, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+
+print(f"Wygenerowano {args.rows} syntetycznych wierszy w pliku {args.output}.")
@@ -0,0 +1,81 @@
+import argparse
+import sys
+
+# Uruchamianie benchmarków bez interfejsu (cron, CI): python -m medbase bench --sizes 10 100 --backends pg --ops read
+# Moduły baz danych i pandas importowane dopiero w wybranym poleceniu, połączenia otwierane przy pierwszym użyciu.
+
+
+def bench(args):
+    from medbase.results_store import new_run_id, to_long
+    from medbase.tester import DatabaseTester
+
+    tester = DatabaseTester(id_allocation=args.id_allocation, instrument=args.instrument, profiler=args.profiler)
+
+    if args.list_ops:
+        for operation in tester.select_operations(backends=args.backends):
+            print(f'{operation.backend}:{operation.name}')
+        return 0
+
+    run_id = args.run_id or new_run_id()
+
+    def report(progress):
+        if not args.quiet:
+            print(f"[{progress['completed']}/{progress['total']}] size {progress['size']}, {progress['indexes']}, "
+                  f"{progress['aggregates']}, iteration {progress['iteration']}: {progress['operation']}",
+                  file=sys.stderr)
+
+    # Te same ustawienia domyślne co w interfejsie - wyniki trafiają do tego samego magazynu historii
+    try:
+        results = tester.run_tests(num_iterations=args.iterations, warmup_iterations=args.warmup,
+                                   index_modes=args.index_modes, aggregate_modes=args.aggregate_modes,
+                                   data_sizes=sorted(args.sizes or DatabaseTester.DEFAULT_DATA_SIZES),
+                                   data_source=args.data_source, dataset_reset=args.dataset_reset,
+                                   baseline_rows=args.baseline_rows, seed=args.seed, operations=args.ops,
+                                   backends=args.backends, result_formats=args.formats, run_id=run_id,
+                                   progress_callback=report)
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+
+    print(f"Run {run_id} finished")
+    for backend, operation, size, variant, stat, value in to_long(results):
+        if stat == args.stat:
+            print(f"{backend:<6} {operation:<32} {size:>10} {variant:<40} {value:.6f}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m medbase')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    parser_bench = commands.add_parser('bench', help="Run the CRUD benchmark without the dashboard")
+    parser_bench.add_argument('--sizes', type=int, nargs='+')
+    parser_bench.add_argument('--backends', nargs='+', choices=('mongo', 'pg'))
+    # Nazwy operacji ('read') albo 'baza:nazwa' ('mongo:update_many')
+    parser_bench.add_argument('--ops', nargs='+')
+    parser_bench.add_argument('--list-ops', action='store_true')
+    parser_bench.add_argument('--iterations', type=int, default=5)
+    parser_bench.add_argument('--warmup', type=int, default=1)
+    parser_bench.add_argument('--index-modes', nargs='+', default=['indexed'], choices=('indexed', 'unindexed'))
+    parser_bench.add_argument('--aggregate-modes', nargs='+', default=['adhoc'], choices=('adhoc', 'precomputed'))
+    parser_bench.add_argument('--data-source', default='files', choices=('files', 'synthetic'))
+    parser_bench.add_argument('--dataset-reset', default='iteration', choices=('iteration', 'size', 'none'))
+    parser_bench.add_argument('--baseline-rows', type=int)
+    parser_bench.add_argument('--seed', type=int, default=0)
+    parser_bench.add_argument('--id-allocation', default='memory', choices=('memory', 'shared'))
+    # Liczniki serwera, plany zapytań i fazy czasu dla każdego punktu (medbase.instrumentation)
+    parser_bench.add_argument('--instrument', nargs='+', default=[], choices=('counters', 'explain', 'phases'))
+    # Zrzut profilu każdej operacji w dodatkowej iteracji (profiles/<run_id>/)
+    parser_bench.add_argument('--profiler', choices=('cprofile', 'pyinstrument'))
+    parser_bench.add_argument('--formats', nargs='+', default=['store'], choices=('store', 'csv', 'parquet'))
+    parser_bench.add_argument('--run-id')
+    parser_bench.add_argument('--stat', default='avg')
+    parser_bench.add_argument('--quiet', action='store_true')
+    parser_bench.set_defaults(handler=bench)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
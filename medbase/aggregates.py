@@ -0,0 +1,159 @@
+# Podsumowanie pod zapytania złożone: liczba pacjentów i suma wieku w grupach
+# (wykształcenie, dochód, wysokie ryzyko = wysoki cholesterol i nadciśnienie).
+# Dochód jest kluczem grupy, więc z podsumowania da się dokładnie policzyć średnie z obu zapytań.
+# Utrzymywane przyrostowo: +1 / -1 dla zmienianych pacjentów w tej samej transakcji co zmiana.
+
+MONGO_STATS_COLLECTION = 'patient_stats'
+
+PG_STATS_TABLE = """
+    CREATE TABLE IF NOT EXISTS patient_stats (
+        education INTEGER NOT NULL,
+        income INTEGER NOT NULL,
+        high_risk BOOLEAN NOT NULL,
+        patient_count BIGINT NOT NULL,
+        age_sum BIGINT NOT NULL,
+        PRIMARY KEY (education, income, high_risk)
+    )
+"""
+
+PG_STATS_REBUILD = """
+    INSERT INTO patient_stats (education, income, high_risk, patient_count, age_sum)
+    SELECT p.education, p.income, COALESCE(d.high_cholesterol AND d.high_blood_pressure, FALSE),
+           COUNT(*), SUM(p.age)
+    FROM patients p
+    LEFT JOIN diseases d ON d.patient_id = p.patient_id
+    GROUP BY 1, 2, 3
+"""
+
+# Parametry w stylu DBAPI (psycopg2) - wykonywane kursorem w transakcji zmiany.
+# ORDER BY: równoległe transakcje blokują wiersze podsumowania w tej samej kolejności.
+PG_STATS_DELTA = """
+    INSERT INTO patient_stats (education, income, high_risk, patient_count, age_sum)
+    SELECT p.education, p.income, COALESCE(d.high_cholesterol AND d.high_blood_pressure, FALSE),
+           %(sign)s * COUNT(*), %(sign)s * SUM(p.age)
+    FROM patients p
+    LEFT JOIN diseases d ON d.patient_id = p.patient_id
+    WHERE p.patient_id = ANY(%(patient_ids)s)
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+    ON CONFLICT (education, income, high_risk) DO UPDATE
+    SET patient_count = patient_stats.patient_count + EXCLUDED.patient_count,
+        age_sum = patient_stats.age_sum + EXCLUDED.age_sum
+"""
+
+PG_QUERY_1_PRECOMPUTED = """
+    SELECT education,
+        SUM(patient_count) AS patient_count,
+        SUM(age_sum) / NULLIF(SUM(patient_count), 0) AS average_age,
+        SUM(income * patient_count) / NULLIF(SUM(patient_count), 0) AS average_income
+    FROM patient_stats
+    WHERE high_risk AND patient_count > 0
+    GROUP BY education
+    ORDER BY average_income DESC
+    LIMIT :num_records
+"""
+
+PG_QUERY_2_PRECOMPUTED = """
+    WITH avg_income AS (
+        SELECT SUM(income * patient_count) / NULLIF(SUM(patient_count), 0) AS avg_income
+        FROM patient_stats
+    ),
+    filtered_patients AS (
+        SELECT s.education,
+            SUM(s.income * s.patient_count) / NULLIF(SUM(s.patient_count), 0) AS average_income,
+            SUM(s.patient_count) AS patient_count
+        FROM patient_stats s
+        JOIN avg_income ai ON s.income > ai.avg_income
+        WHERE s.patient_count > 0
+        GROUP BY s.education
+    )
+    SELECT education, average_income, patient_count
+    FROM filtered_patients
+    WHERE patient_count > 5
+    AND average_income > 50000
+    ORDER BY average_income DESC
+    LIMIT :num_records
+"""
+
+
+def mongo_stats_group(sign=1):
+    return {"$group": {
+        "_id": {
+            "education": "$demographics.education",
+            "income": "$demographics.income",
+            "high_risk": {"$and": ["$diseases.high_cholesterol", "$diseases.high_blood_pressure"]},
+        },
+        "patient_count": {"$sum": sign},
+        "age_sum": {"$sum": {"$multiply": [sign, "$demographics.age"]}},
+    }}
+
+
+def mongo_stats_rebuild_pipeline():
+    return [mongo_stats_group(), {"$out": MONGO_STATS_COLLECTION}]
+
+
+# $merge dodaje deltę do istniejących dokumentów podsumowania albo wstawia nowe
+def mongo_stats_delta_pipeline(patient_ids, sign):
+    return [
+        {"$match": {"patient_id": {"$in": patient_ids}}},
+        mongo_stats_group(sign),
+        {"$merge": {
+            "into": MONGO_STATS_COLLECTION,
+            "on": "_id",
+            "whenMatched": [{"$set": {
+                "patient_count": {"$add": ["$patient_count", "$$new.patient_count"]},
+                "age_sum": {"$add": ["$age_sum", "$$new.age_sum"]},
+            }}],
+            "whenNotMatched": "insert",
+        }},
+    ]
+
+
+def mongo_query_1_precomputed_pipeline(num_records):
+    return [
+        {"$match": {"_id.high_risk": True, "patient_count": {"$gt": 0}}},
+        {"$group": {
+            "_id": "$_id.education",
+            "patient_count": {"$sum": "$patient_count"},
+            "age_sum": {"$sum": "$age_sum"},
+            "income_sum": {"$sum": {"$multiply": ["$_id.income", "$patient_count"]}},
+        }},
+        {"$project": {
+            "patient_count": 1,
+            "average_age": {"$divide": ["$age_sum", "$patient_count"]},
+            "average_income": {"$divide": ["$income_sum", "$patient_count"]},
+        }},
+        {"$sort": {"average_income": -1}},
+        {"$limit": num_records},
+    ]
+
+
+def mongo_query_2_precomputed_pipeline(num_records):
+    return [
+        {"$match": {"patient_count": {"$gt": 0}}},
+        {"$set": {"income_sum": {"$multiply": ["$_id.income", "$patient_count"]}}},
+        {"$setWindowFields": {
+            "output": {
+                "total_income": {"$sum": "$income_sum", "window": {"documents": ["unbounded", "unbounded"]}},
+                "total_count": {"$sum": "$patient_count", "window": {"documents": ["unbounded", "unbounded"]}},
+            }
+        }},
+        {"$match": {
+            "$expr": {"$gt": ["$_id.income", {"$divide": ["$total_income", "$total_count"]}]}
+        }},
+        {"$group": {
+            "_id": "$_id.education",
+            "income_sum": {"$sum": "$income_sum"},
+            "patient_count": {"$sum": "$patient_count"},
+        }},
+        {"$project": {
+            "patient_count": 1,
+            "average_income": {"$divide": ["$income_sum", "$patient_count"]},
+        }},
+        {"$match": {
+            "patient_count": {"$gt": 5},
+            "average_income": {"$gt": 50000},
+        }},
+        {"$sort": {"average_income": -1}},
+        {"$limit": num_records},
+    ]
@@ -0,0 +1,69 @@
+import threading
+import timeit
+
+from pymongo import monitoring
+
+
+# Czas pobierania połączeń z puli, sumowany osobno dla każdego wątku i bazy.
+# Harness odejmuje go od czasu operacji, żeby efekty puli nie mieszały się z czasem zapytań.
+class AcquireTimer:
+    def __init__(self):
+        self.local = threading.local()
+
+    def _totals(self):
+        if not hasattr(self.local, 'totals'):
+            self.local.totals = {}
+        return self.local.totals
+
+    def add(self, backend, seconds):
+        totals = self._totals()
+        totals[backend] = totals.get(backend, 0.0) + seconds
+
+    def take(self, backend):
+        return self._totals().pop(backend, 0.0)
+
+    def reset(self):
+        self._totals().clear()
+
+
+# Zdarzenia puli pymongo są wywoływane synchronicznie w wątku, który pobiera połączenie
+class MongoPoolTimingListener(monitoring.ConnectionPoolListener):
+    def __init__(self, acquire_timer):
+        self.acquire_timer = acquire_timer
+        self.local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self.local.started = timeit.default_timer()
+
+    def connection_checked_out(self, event):
+        started = getattr(self.local, 'started', None)
+        if started is not None:
+            self.acquire_timer.add('mongo', timeit.default_timer() - started)
+            self.local.started = None
+
+    def connection_check_out_failed(self, event):
+        self.local.started = None
+
+    def connection_checked_in(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+# Zagnieżdżony dokument pacjenta: (sekcja, pole, kolumna w CSV, typ)
+DOCUMENT_FIELDS = [
+    ("demographics", "sex", "Sex", int),
+    ("demographics", "age", "Age", float),
+    ("demographics", "education", "Education", int),
+    ("demographics", "income", "Income", int),
+    ("health_status", "gen_health", "GenHlth", int),
+    ("health_status", "ment_health_days", "MentHlth", int),
+    ("health_status", "phys_health_days", "PhysHlth", int),
+    ("health_status", "difficulty_walking", "DiffWalk", bool),
+    ("lifestyle", "physical_activity", "PhysActivity", bool),
+    ("lifestyle", "smoker", "Smoker", bool),
+    ("lifestyle", "fruits", "Fruits", bool),
+    ("lifestyle", "veggies", "Veggies", bool),
+    ("diseases", "heart_disease", "HeartDiseaseorAttack", bool),
+    ("diseases", "stroke", "Stroke", bool),
+    ("diseases", "diabetes", "Diabetes", bool),
+    ("diseases", "high_blood_pressure", "HighBP", bool),
+    ("diseases", "high_cholesterol", "HighChol", bool),
+]
+
+# Klucze płaskich rekordów JSON (np. eksport bez sekcji) -> nazwy kolumn CSV
+RECORD_ALIASES = {
+    "sex": "Sex",
+    "age": "Age",
+    "education": "Education",
+    "income": "Income",
+    "genhlth": "GenHlth",
+    "menthlth": "MentHlth",
+    "physhlth": "PhysHlth",
+    "diffwalk": "DiffWalk",
+    "phys_activity": "PhysActivity",
+    "smoker": "Smoker",
+    "fruits": "Fruits",
+    "veggies": "Veggies",
+    "heartdiseaseorattack": "HeartDiseaseorAttack",
+    "stroke": "Stroke",
+    "diabetes": "Diabetes",
+    "highbp": "HighBP",
+    "highchol": "HighChol",
+}
+
+
+# Pola zagnieżdżonych dokumentów z patients_data.json (non_relational_db_script.py) -> nazwy kolumn CSV
+NESTED_COLUMNS = {f"{section}.{field}": column for section, field, column, _ in DOCUMENT_FIELDS}
+
+SECTIONS = list(dict.fromkeys(section for section, *_ in DOCUMENT_FIELDS))
+
+
+# Sekcje-słowniki rozwijane do płaskich kolumn; brakująca sekcja daje NaN, więc rekord zostanie pominięty
+def flatten_nested_records(frame):
+    columns = {}
+    for section in SECTIONS:
+        if section not in frame.columns:
+            continue
+        values = [value if isinstance(value, dict) else {} for value in frame[section]]
+        for field, value in pd.DataFrame.from_records(values, index=frame.index).items():
+            columns[NESTED_COLUMNS.get(f"{section}.{field}", f"{section}.{field}")] = value
+    return frame.drop(columns=[section for section in SECTIONS if section in frame.columns]).assign(**columns)
+
+
+def build_patient_documents(frame, first_patient_id=1):
+    if len(frame) == 0:
+        return []
+    frame = frame.rename(columns=RECORD_ALIASES)
+    if any(section in frame.columns for section in SECTIONS):
+        frame = flatten_nested_records(frame)
+
+    missing = [column for _, _, column, _ in DOCUMENT_FIELDS if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Unknown patient record format, missing columns: {', '.join(missing)}")
+
+    # Rekordy bez danych pacjenta są pomijane, ale zachowują swój patient_id
+    patient_ids = np.arange(first_patient_id, first_patient_id + len(frame))
+    mask = frame["Sex"].notna().to_numpy()
+    if not mask.all():
+        frame = frame[mask]
+        patient_ids = patient_ids[mask]
+
+    # Rzutowanie całych kolumn naraz; tolist() zwraca natywne typy Pythona (int/float/bool)
+    sections = {}
+    for section, field, column, dtype in DOCUMENT_FIELDS:
+        fields, values = sections.setdefault(section, ([], []))
+        fields.append(field)
+        values.append(frame[column].to_numpy().astype(dtype).tolist())
+
+    section_documents = [
+        [dict(zip(fields, row)) for row in zip(*values)]
+        for fields, values in sections.values()
+    ]
+
+    keys = ["patient_id", *sections]
+    return [dict(zip(keys, row)) for row in zip(patient_ids.tolist(), *section_documents)]
@@ -0,0 +1,142 @@
+import abc
+import threading
+
+from pymongo import ReturnDocument
+from sqlalchemy import text
+
+
+# Przydział patient_id ciągłymi blokami z pamięci. Źródło bloków (_reserve) zależy od podklasy:
+# lokalny licznik zasiany raz przez MAX(patient_id), SEQUENCE w PostgreSQL albo dokument-licznik w MongoDB.
+class IdAllocator(abc.ABC):
+    def __init__(self, block_size=10000):
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.next_id = None
+        self.block_end = None
+
+    # Rezerwuje ciągły zakres count id i zwraca pierwsze z nich
+    @abc.abstractmethod
+    def _reserve(self, count):
+        pass
+
+    # Zwraca pierwsze id ciągłego zakresu [first, first + count)
+    def allocate(self, count):
+        with self.lock:
+            if self.next_id is None or self.next_id + count > self.block_end:
+                # Reszta bieżącego bloku przepada - zakres musi być ciągły
+                size = max(count, self.block_size)
+                self.next_id = self._reserve(size)
+                self.block_end = self.next_id + size
+
+            first_id = self.next_id
+            self.next_id += count
+            return first_id
+
+    def reset(self):
+        with self.lock:
+            self.next_id = None
+            self.block_end = None
+
+    # Po wyczyszczeniu danych numeracja zaczyna się od nowa od MAX(patient_id)
+    def restart(self):
+        self.reset()
+
+
+class LocalIdAllocator(IdAllocator):
+    def __init__(self, seed, block_size=10000):
+        super().__init__(block_size)
+        self.seed = seed
+        self.high = None
+
+    def _reserve(self, count):
+        if self.high is None:
+            self.high = self.seed()
+        first_id = self.high + 1
+        self.high += count
+        return first_id
+
+    def reset(self):
+        super().reset()
+        self.high = None
+
+
+# Bezpieczny dla wielu procesów: blok rezerwowany pod blokadą doradczą w jednej transakcji
+class PostgresSequenceIdAllocator(IdAllocator):
+    LOCK_KEY = 710021
+
+    def __init__(self, engine, sequence='patients_patient_id_seq', block_size=10000):
+        super().__init__(block_size)
+        self.engine = engine
+        self.sequence = sequence
+        self.seeded = False
+
+    def _seed(self, connection):
+        connection.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {self.sequence}"))
+        connection.execute(text(f"""
+            SELECT setval('{self.sequence}', GREATEST(
+                (SELECT COALESCE(MAX(patient_id), 0) FROM patients),
+                (SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {self.sequence})
+            ) + 1, false)
+        """))
+        self.seeded = True
+
+    def _reserve(self, count):
+        with self.engine.begin() as connection:
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': self.LOCK_KEY})
+            if not self.seeded:
+                self._seed(connection)
+
+            first_id = connection.execute(text(f"SELECT nextval('{self.sequence}')")).scalar()
+            connection.execute(text(f"SELECT setval('{self.sequence}', :last_id)"), {'last_id': first_id + count - 1})
+        return first_id
+
+    def reset(self):
+        super().reset()
+        self.seeded = False
+
+    # Cofa SEQUENCE do MAX(patient_id) - tylko gdy żaden inny proces nie wstawia w tym czasie
+    def restart(self):
+        super().restart()
+        with self.engine.begin() as connection:
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': self.LOCK_KEY})
+            connection.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {self.sequence}"))
+            connection.execute(text(
+                f"SELECT setval('{self.sequence}', (SELECT COALESCE(MAX(patient_id), 0) FROM patients) + 1, false)"
+            ))
+        self.seeded = True
+
+
+# Atomowy $inc na dokumencie-liczniku w kolekcji counters
+class MongoCounterIdAllocator(IdAllocator):
+    def __init__(self, db, collection, name='patient_id', block_size=10000):
+        super().__init__(block_size)
+        self.counters = db['counters']
+        self.collection = collection
+        self.name = name
+        self.seeded = False
+
+    def _reserve(self, count):
+        if not self.seeded:
+            last_record = self.collection.find_one(sort=[("patient_id", -1)])
+            max_patient_id = last_record['patient_id'] if last_record else 0
+            self.counters.update_one({"_id": self.name}, {"$max": {"value": max_patient_id}}, upsert=True)
+            self.seeded = True
+
+        counter = self.counters.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"value": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter['value'] - count + 1
+
+    def reset(self):
+        super().reset()
+        self.seeded = False
+
+    def restart(self):
+        super().restart()
+        last_record = self.collection.find_one(sort=[("patient_id", -1)])
+        max_patient_id = last_record['patient_id'] if last_record else 0
+        self.counters.update_one({"_id": self.name}, {"$set": {"value": max_patient_id}}, upsert=True)
+        self.seeded = True
@@ -0,0 +1,316 @@
+import threading
+from contextlib import contextmanager, nullcontext
+from types import SimpleNamespace
+
+import sqlalchemy
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+from sqlalchemy import event, text
+
+from medbase.profiling import (PHASES, MongoWaitListener, PhaseTimer, attach_pg_wait_listeners, profile_to,
+                               validate_profiler)
+
+# Instrumentacja operacji benchmarku, poza mierzonym czasem:
+# 'counters' - przyrosty liczników serwera w trakcie operacji (pg_stat_statements, serverStatus),
+# 'explain' - plany zapytań wykonanych przez operację (EXPLAIN ANALYZE / explain executionStats),
+# 'phases' - podział czasu operacji na fazy (medbase.profiling).
+INSTRUMENT_OPTIONS = ('counters', 'explain', 'phases')
+
+# Ile różnych zapytań jednej operacji trafia do EXPLAIN (update per_document to tysiące takich samych poleceń)
+MAX_EXPLAINED = 3
+
+# Polecenia MongoDB, które mają plan; insert go nie ma
+MONGO_EXPLAINABLE = ('find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify')
+
+# Pola sesji i transakcji dodawane przez sterownik - explain ich nie przyjmuje
+MONGO_SESSION_FIELDS = ('lsid', 'txnNumber', 'autocommit', 'startTransaction', 'writeConcern', 'readConcern')
+
+PG_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+# INSERT powtórzony po zatwierdzeniu oryginału zawsze narusza klucz unikalny - tylko plan, bez ANALYZE
+PG_PLAN_ONLY = ('INSERT',)
+
+# Sumy z pg_stat_statements dla bieżącej bazy, bez zapytań samego odczytu liczników
+PG_STATEMENTS_SNAPSHOT = """
+    SELECT COALESCE(SUM(calls), 0), COALESCE(SUM(total_exec_time), 0), COALESCE(SUM(rows), 0),
+           COALESCE(SUM(shared_blks_hit), 0), COALESCE(SUM(shared_blks_read), 0)
+    FROM pg_stat_statements
+    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+      AND position('pg_stat_statements' in query) = 0
+"""
+PG_STATEMENTS_COLUMNS = ('calls', 'exec_time_ms', 'rows', 'blks_hit', 'blks_read')
+
+MONGO_OPCOUNTERS = ('insert', 'query', 'update', 'delete', 'getmore', 'command')
+
+
+# Zapytania wysłane przez bieżącą operację, osobno dla każdego wątku; poza oknem operacji nic nie jest zbierane
+class StatementCapture:
+    def __init__(self):
+        self.local = threading.local()
+
+    def start(self):
+        self.local.statements = []
+
+    def stop(self):
+        statements = getattr(self.local, 'statements', None) or []
+        self.local.statements = None
+        return statements
+
+    def add(self, statement):
+        statements = getattr(self.local, 'statements', None)
+        if statements is not None:
+            statements.append(statement)
+
+
+class MongoCommandCapture(monitoring.CommandListener):
+    def __init__(self, capture):
+        self.capture = capture
+
+    def started(self, event):
+        if event.command_name in MONGO_EXPLAINABLE:
+            self.capture.add(('mongo', event.database_name, event.command_name, dict(event.command)))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def plan_nodes(plan):
+    node = plan['Node Type'] + (f" on {plan['Relation Name']}" if 'Relation Name' in plan else '')
+    if 'Index Name' in plan:
+        node += f" using {plan['Index Name']}"
+    return [node] + [child for subplan in plan.get('Plans', []) for child in plan_nodes(subplan)]
+
+
+def summarize_pg_plan(explained):
+    plan = explained[0]
+    return {
+        'nodes': plan_nodes(plan['Plan']),
+        'planning_ms': plan.get('Planning Time'),
+        'execution_ms': plan.get('Execution Time'),
+        'shared_hit': plan['Plan'].get('Shared Hit Blocks'),
+        'shared_read': plan['Plan'].get('Shared Read Blocks'),
+    }
+
+
+def mongo_stages(document):
+    if isinstance(document, dict):
+        stages = [document['stage']] if isinstance(document.get('stage'), str) else []
+        # Etapy potoku aggregate: {'$group': ...}, {'$sort': ...}
+        stages += [key for key in document if key.startswith('$') and key != '$cursor' and isinstance(document[key], dict)]
+        return stages + [stage for value in document.values() for stage in mongo_stages(value)]
+    if isinstance(document, list):
+        return [stage for value in document for stage in mongo_stages(value)]
+    return []
+
+
+def find_key(document, key):
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        values = document.values()
+    elif isinstance(document, list):
+        values = document
+    else:
+        return None
+    for value in values:
+        found = find_key(value, key)
+        if found is not None:
+            return found
+    return None
+
+
+def summarize_mongo_plan(explained):
+    stats = find_key(explained, 'executionStats') or {}
+    return {
+        'nodes': list(dict.fromkeys(mongo_stages(find_key(explained, 'winningPlan')) + mongo_stages(explained.get('stages', [])))),
+        'execution_ms': stats.get('executionTimeMillis'),
+        'returned': stats.get('nReturned'),
+        'keys_examined': stats.get('totalKeysExamined'),
+        'docs_examined': stats.get('totalDocsExamined'),
+    }
+
+
+class Instrumentation:
+    def __init__(self, options=(), profiler=None):
+        for option in options:
+            if option not in INSTRUMENT_OPTIONS:
+                raise ValueError(f"Unknown instrumentation option: {option}")
+        validate_profiler(profiler)
+        self.options = tuple(options)
+        self.profiler = profiler
+        self.capture = StatementCapture()
+        self.phases = PhaseTimer()
+        self.local = threading.local()
+        # Ustawiane przez harness - EXPLAIN tylko w wybranych iteracjach, bo wykonuje zapytania jeszcze raz
+        self.explain_active = False
+        # Ustawiana przez harness ścieżka (bez rozszerzenia) zrzutu profilu następnej operacji
+        self.profile_path = None
+        self.engine = None
+        self.mongo_client = None
+        self.pg_counters_available = True
+
+    @property
+    def enabled(self):
+        return bool(self.options) or self.profiler is not None
+
+    # Słuchacze poleceń przekazywani do MongoClient - tylko gdy potrzebne, bez narzutu w zwykłych pomiarach
+    def mongo_listeners(self):
+        listeners = []
+        if 'explain' in self.options:
+            listeners.append(MongoCommandCapture(self.capture))
+        if 'phases' in self.options:
+            listeners.append(MongoWaitListener(self.phases))
+        return listeners
+
+    def attach_mongo(self, client):
+        self.mongo_client = client
+
+    def attach_pg(self, engine):
+        self.engine = engine
+        if 'explain' in self.options:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        if 'phases' in self.options:
+            attach_pg_wait_listeners(engine, self.phases)
+
+    def _before_cursor_execute(self, connection, cursor, statement, parameters, context, executemany):
+        if executemany:
+            parameters = parameters[0] if parameters else None
+        self.capture.add(('pg', statement, parameters))
+
+    # Liczniki
+
+    def pg_counters(self):
+        if self.engine is None or not self.pg_counters_available:
+            return None
+        try:
+            with self.engine.connect() as connection:
+                row = connection.execute(text(PG_STATEMENTS_SNAPSHOT)).one()
+        except sqlalchemy.exc.DBAPIError:
+            # Brak rozszerzenia pg_stat_statements (CREATE EXTENSION + shared_preload_libraries)
+            self.pg_counters_available = False
+            return None
+        return dict(zip(PG_STATEMENTS_COLUMNS, map(float, row)))
+
+    def mongo_counters(self):
+        if self.mongo_client is None:
+            return None
+        status = self.mongo_client.admin.command({'serverStatus': 1, 'repl': 0, 'locks': 0, 'wiredTiger': 0})
+        counters = {name: status['opcounters'][name] for name in MONGO_OPCOUNTERS}
+        query_executor = status.get('metrics', {}).get('queryExecutor', {})
+        counters['keys_examined'] = query_executor.get('scanned', 0)
+        counters['docs_examined'] = query_executor.get('scannedObjects', 0)
+        return counters
+
+    def counters(self, backend):
+        return self.mongo_counters() if backend == 'mongo' else self.pg_counters()
+
+    # Plany
+
+    def explain_pg(self, statement, parameters):
+        # ANALYZE wykonuje zapytanie naprawdę - zmiany danych (UPDATE/DELETE) są wycofywane
+        options = 'FORMAT JSON' if statement.lstrip().upper().startswith(PG_PLAN_ONLY) else 'ANALYZE, BUFFERS, FORMAT JSON'
+        with self.engine.connect() as connection:
+            transaction = connection.begin()
+            try:
+                explained = connection.exec_driver_sql(
+                    f"EXPLAIN ({options}) {statement}", parameters or None).scalar()
+            finally:
+                transaction.rollback()
+        return explained
+
+    def explain_mongo(self, database, command_name, command):
+        command = {key: value for key, value in command.items()
+                   if not key.startswith('$') and key not in MONGO_SESSION_FIELDS}
+        # explain zapisów przyjmuje jedno polecenie (explain update/delete niczego nie zmienia)
+        for field in ('updates', 'deletes'):
+            if field in command:
+                command[field] = command[field][:1]
+        # $out/$merge nie mają executionStats - sam plan
+        writes = command_name == 'aggregate' and any(
+            '$out' in stage or '$merge' in stage for stage in command.get('pipeline', []))
+        return self.mongo_client[database].command(
+            {'explain': command, 'verbosity': 'queryPlanner' if writes else 'executionStats'})
+
+    def explain(self, statements):
+        explained = []
+        seen = set()
+        for statement in statements:
+            if statement[0] == 'pg':
+                _, sql, parameters = statement
+                key = sql
+                if not sql.lstrip().upper().startswith(PG_EXPLAINABLE):
+                    continue
+            else:
+                _, database, command_name, command = statement
+                key = (command_name, command.get(command_name))
+            if key in seen:
+                continue
+            seen.add(key)
+            if len(seen) > MAX_EXPLAINED:
+                break
+
+            try:
+                if statement[0] == 'pg':
+                    plan = self.explain_pg(sql, parameters)
+                    entry = {'query': sql.strip(), **summarize_pg_plan(plan), 'plan': plan}
+                else:
+                    plan = self.explain_mongo(database, command_name, command)
+                    plan = {key: value for key, value in plan.items() if not key.startswith('$') and key != 'operationTime'}
+                    entry = {'query': f"{command_name} {command.get(command_name)}", **summarize_mongo_plan(plan), 'plan': plan}
+            except (sqlalchemy.exc.DBAPIError, PyMongoError) as exc:
+                entry = {'query': str(key), 'error': str(exc)}
+            explained.append(entry)
+        return explained
+
+    # Okno jednej operacji: liczniki przed, zbieranie zapytań, liczniki po i plany - wszystko poza mierzonym czasem.
+    # Przyrosty liczników trafiają do metrics jako serie 'server_<licznik>', fazy jako 'phase_<faza>'.
+    # Harness wpisuje do observation.elapsed zmierzony czas operacji (bez pobierania połączeń z puli).
+    @contextmanager
+    def observe(self, backend, metrics):
+        observation = SimpleNamespace(elapsed=None)
+        if not self.enabled:
+            yield observation
+            return
+
+        before = self.counters(backend) if 'counters' in self.options else None
+        profile_path, self.profile_path = self.profile_path, None
+        profiling = profile_to(self.profiler, profile_path) if self.profiler and profile_path else nullcontext()
+        self.capture.start()
+        if 'phases' in self.options:
+            self.phases.start()
+        try:
+            with profiling as profile_file:
+                yield observation
+        finally:
+            statements = self.capture.stop()
+            phases = self.phases.stop()
+
+        report = {}
+        if phases is not None and observation.elapsed is not None:
+            # Reszta czasu operacji to sterownik (kodowanie, kompilacja zapytań, narzut bibliotek)
+            phases['driver'] = max(observation.elapsed - sum(phases.values()), 0.0)
+            for name in PHASES:
+                metrics.record(f'phase_{name}', phases[name])
+            report['phases'] = phases
+        if profile_file is not None:
+            report['profile'] = profile_file
+        after = self.counters(backend) if before is not None else None
+        if after is not None:
+            deltas = {name: after[name] - before[name] for name in before}
+            if backend == 'mongo':
+                # Sam odczyt serverStatus to jedno polecenie
+                deltas['command'] -= 1
+            for name, value in deltas.items():
+                metrics.record(f'server_{name}', value)
+            report['counters'] = deltas
+        if 'explain' in self.options and self.explain_active:
+            report['queries'] = self.explain(statements)
+        self.local.report = report or None
+
+    def take_report(self):
+        report = getattr(self.local, 'report', None)
+        self.local.report = None
+        return report
@@ -0,0 +1,89 @@
+import random
+import threading
+import timeit
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from medbase.registry import run_operation
+from medbase.stats import summarize
+
+# Domyślna mieszanka operacji (wagi) dla obu baz
+DEFAULT_MIX = {
+    'insert': 20,
+    'read': 40,
+    'update': 20,
+    'delete': 10,
+    'complex_query_1': 5,
+    'complex_query_2': 5,
+}
+
+
+# Wariant operacji z rejestru używany pod obciążeniem (domyślnie ta sama nazwa co w mieszance)
+LOAD_OPERATIONS = {
+    'insert': {'mongo': 'insert_bulk', 'pg': 'insert_batched'},
+    'update': {'mongo': 'update_many'},
+}
+
+
+def build_operations(registry, context, mix=None):
+    operations = {}
+    for backend in dict.fromkeys(operation.backend for operation in registry):
+        for name in mix or DEFAULT_MIX:
+            registry_name = LOAD_OPERATIONS.get(name, {}).get(backend, name)
+            if (backend, registry_name) in registry.operations:
+                operation = registry.get(backend, registry_name)
+                operations[(backend, name)] = lambda operation=operation: run_operation(operation, context)
+    return operations
+
+
+# N wątków wykonuje losową (ważoną) mieszankę operacji; dla każdego poziomu współbieżności
+# zwraca przepustowość i percentyle opóźnień per (baza, operacja)
+def run_load(operations, concurrency_levels=(1, 2, 4, 8, 16), operations_per_worker=50,
+             mix=None, backends=('mongo', 'pg'), seed=None):
+    mix = mix or DEFAULT_MIX
+    keys = [(backend, operation) for backend in backends for operation in mix if (backend, operation) in operations]
+    weights = [mix[operation] for _, operation in keys]
+
+    results = []
+    for concurrency in concurrency_levels:
+        errors = defaultdict(int)
+        errors_lock = threading.Lock()
+
+        def worker(worker_id):
+            rng = random.Random(None if seed is None else seed * 1000 + worker_id)
+            latencies = []
+            for _ in range(operations_per_worker):
+                key = rng.choices(keys, weights)[0]
+                start_time = timeit.default_timer()
+                try:
+                    operations[key]()
+                except Exception:
+                    with errors_lock:
+                        errors[key] += 1
+                    continue
+                latencies.append((key, timeit.default_timer() - start_time))
+            return latencies
+
+        latencies = defaultdict(list)
+        wall_start = timeit.default_timer()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for worker_latencies in pool.map(worker, range(concurrency)):
+                for key, latency in worker_latencies:
+                    latencies[key].append(latency)
+        wall_time = timeit.default_timer() - wall_start
+
+        for backend, operation in keys:
+            values = latencies.get((backend, operation), [])
+            row = {
+                "concurrency": concurrency,
+                "backend": backend,
+                "operation": operation,
+                "count": len(values),
+                "errors": errors.get((backend, operation), 0),
+                "throughput": len(values) / wall_time,
+            }
+            for stat, value in summarize(values).items():
+                row[f"latency_{stat}"] = value
+            results.append(row)
+
+    return results
@@ -0,0 +1,102 @@
+import os
+import threading
+import timeit
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# Bieżący RSS procesu w bajtach: psutil, jeśli jest zainstalowany, w przeciwnym razie /proc (Linux)
+def current_rss():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+# Próbkuje RSS w osobnym wątku; growth to największy przyrost ponad RSS z chwili wejścia.
+# Wątek próbkujący konkuruje o GIL - używany tylko w osobnym, niemierzonym przebiegu operacji.
+class PeakRssMonitor:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.baseline = None
+        self.peak = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is not None and rss > self.peak:
+            self.peak = rss
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self.baseline = self.peak = current_rss()
+        if self.baseline is not None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+            self._sample()
+        return False
+
+    @property
+    def growth(self):
+        if self.baseline is None:
+            return None
+        return self.peak - self.baseline
+
+
+# Dodatkowe pomiary bieżącej operacji (np. czas do pierwszego wiersza), osobno dla każdego wątku.
+# Harness zbiera je po operacji jako serie '<metryka>_<operacja>'.
+class OperationMetrics:
+    def __init__(self):
+        self.local = threading.local()
+
+    def record(self, name, value):
+        if not hasattr(self.local, 'values'):
+            self.local.values = {}
+        self.local.values[name] = value
+
+    def take(self):
+        values = getattr(self.local, 'values', {})
+        self.local.values = {}
+        return values
+
+
+# Odczyt strumieniowy: czas od wysłania zapytania do pierwszego wiersza (first_row, s).
+# Wejście po pobraniu połączenia, żeby nie liczyć czasu puli.
+class ReadProbe:
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.start_time = None
+        self.first_row = None
+
+    def rows(self, rows):
+        for row in rows:
+            if self.first_row is None:
+                self.first_row = timeit.default_timer() - self.start_time
+            yield row
+
+    def __enter__(self):
+        self.start_time = timeit.default_timer()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = timeit.default_timer() - self.start_time
+        if exc_info[0] is None:
+            # Pusty wynik: "pierwszy wiersz" to koniec zapytania
+            self.metrics.record('first_row', self.first_row if self.first_row is not None else elapsed)
+        return False
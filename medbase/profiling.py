@@ -0,0 +1,125 @@
+import cProfile
+import os
+import threading
+import timeit
+from contextlib import contextmanager
+
+from pymongo import monitoring
+from sqlalchemy import event
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+# Fazy czasu operacji:
+# 'prepare' - budowa danych do wysłania (dokumenty, krotki, bufory COPY),
+# 'wait' - sieć i serwer: od wysłania polecenia do odebrania odpowiedzi (zdarzenia pymongo / SQLAlchemy),
+# 'materialize' - zamiana wyniku na obiekty Pythona (list(cursor), fetchall() i obiekty Row),
+# 'driver' - reszta czasu operacji: kodowanie BSON / parametrów, kompilacja SQL, narzut sterownika.
+PHASES = ('prepare', 'driver', 'wait', 'materialize')
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+
+# Sumy czasu faz bieżącej operacji, osobno dla każdego wątku. Czas oczekiwania zgłoszony w trakcie
+# fazy (np. getMore w list(cursor)) jest z niej odejmowany, podobnie czas faz zagnieżdżonych.
+class PhaseTimer:
+    def __init__(self):
+        self.local = threading.local()
+
+    def start(self):
+        self.local.totals = dict.fromkeys(PHASES, 0.0)
+        self.local.stack = []
+
+    def stop(self):
+        totals = getattr(self.local, 'totals', None)
+        self.local.totals = None
+        return totals
+
+    @contextmanager
+    def phase(self, name):
+        totals = getattr(self.local, 'totals', None)
+        if totals is None:
+            yield
+            return
+
+        frame = [0.0]
+        self.local.stack.append(frame)
+        start_time = timeit.default_timer()
+        try:
+            yield
+        finally:
+            elapsed = timeit.default_timer() - start_time
+            self.local.stack.pop()
+            totals[name] += elapsed - frame[0]
+            if self.local.stack:
+                self.local.stack[-1][0] += elapsed
+
+    def add_wait(self, seconds):
+        totals = getattr(self.local, 'totals', None)
+        if totals is None:
+            return
+        totals['wait'] += seconds
+        if self.local.stack:
+            self.local.stack[-1][0] += seconds
+
+
+# Czas od wysłania polecenia do zdekodowania odpowiedzi; kodowanie BSON odbywa się przed 'started'
+class MongoWaitListener(monitoring.CommandListener):
+    def __init__(self, phases):
+        self.phases = phases
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.phases.add_wait(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        self.phases.add_wait(event.duration_micros / 1e6)
+
+
+# cursor.execute psycopg2: wysłanie zapytania i odebranie całego wyniku (kursor po stronie klienta);
+# konwersja wierszy na typy Pythona następuje dopiero przy fetch*
+def attach_pg_wait_listeners(engine, phases):
+    def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault('cursor_execute_start', []).append(timeit.default_timer())
+
+    def after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        phases.add_wait(timeit.default_timer() - connection.info['cursor_execute_start'].pop())
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+
+def validate_profiler(profiler):
+    if profiler is None:
+        return
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler: {profiler}")
+    if profiler == 'pyinstrument' and pyinstrument is None:
+        raise ValueError("pyinstrument is not installed (pip install pyinstrument)")
+
+
+# Zrzut profilu jednej operacji: <path>.prof (cProfile, np. snakeviz / pstats) albo <path>.html (pyinstrument)
+@contextmanager
+def profile_to(profiler, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if profiler == 'cprofile':
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield f'{path}.prof'
+        finally:
+            profile.disable()
+            profile.dump_stats(f'{path}.prof')
+    else:
+        profile = pyinstrument.Profiler()
+        profile.start()
+        try:
+            yield f'{path}.html'
+        finally:
+            profile.stop()
+            with open(f'{path}.html', 'w') as output:
+                output.write(profile.output_html())
@@ -0,0 +1,67 @@
+# Rejestr operacji benchmarku. Każda operacja jest deklarowana raz: baza, nazwa,
+# opcjonalne przygotowanie (poza pomiarem), mierzona funkcja i opcjonalne sprzątanie.
+# Wynik trafia zawsze do serii (backend, name) samej operacji.
+class BenchmarkOperation:
+    def __init__(self, backend, name, run, setup=None, teardown=None):
+        self.backend = backend
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.teardown = teardown
+
+    @property
+    def key(self):
+        return (self.backend, self.name)
+
+    def __repr__(self):
+        return f"BenchmarkOperation({self.backend!r}, {self.name!r})"
+
+
+class OperationRegistry:
+    def __init__(self):
+        self.operations = {}
+
+    def register(self, backend, name, run, setup=None, teardown=None):
+        if (backend, name) in self.operations:
+            raise ValueError(f"Operation {backend}:{name} is already registered")
+        operation = BenchmarkOperation(backend, name, run, setup=setup, teardown=teardown)
+        self.operations[operation.key] = operation
+        return operation
+
+    def unregister(self, backend, name):
+        del self.operations[(backend, name)]
+
+    def get(self, backend, name):
+        return self.operations[(backend, name)]
+
+    def select(self, backends=None, names=None):
+        return [
+            operation for operation in self.operations.values()
+            if (backends is None or operation.backend in backends)
+            and (names is None or operation.name in names)
+        ]
+
+    def __iter__(self):
+        return iter(self.operations.values())
+
+    def __len__(self):
+        return len(self.operations)
+
+
+# Jedno wykonanie operacji: setup -> run (mierzony przez measure) -> teardown
+def time_operation(operation, context, measure):
+    prepared = operation.setup(context) if operation.setup else None
+    try:
+        return measure(operation.backend, operation.run, context, prepared)
+    finally:
+        if operation.teardown:
+            operation.teardown(context, prepared)
+
+
+def run_operation(operation, context):
+    prepared = operation.setup(context) if operation.setup else None
+    try:
+        return operation.run(context, prepared)
+    finally:
+        if operation.teardown:
+            operation.teardown(context, prepared)
@@ -0,0 +1,319 @@
+import datetime
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import subprocess
+import uuid
+from contextlib import closing, contextmanager
+
+import pandas as pd
+
+from medbase.stats import STATS
+
+# Historia wyników w jednym pliku SQLite, w formacie długim: jedna wartość = (uruchomienie, seria, statystyka).
+# Seria to (baza, operacja, rozmiar, wariant), np. ('pg', 'insert_copy', 1000, 'aggregates=adhoc,indexes=indexed').
+# Rodzaj uruchomienia mówi, czym jest kolumna size (RUN_KINDS).
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id TEXT PRIMARY KEY,
+        started_at TEXT NOT NULL,
+        git_sha TEXT,
+        config TEXT,
+        config_hash TEXT,
+        kind TEXT NOT NULL DEFAULT 'benchmark'
+    );
+    CREATE INDEX IF NOT EXISTS runs_started_at ON runs (started_at);
+
+    CREATE TABLE IF NOT EXISTS series (
+        series_id INTEGER PRIMARY KEY,
+        backend TEXT NOT NULL,
+        operation TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        variant TEXT NOT NULL,
+        UNIQUE (backend, operation, size, variant)
+    );
+    CREATE INDEX IF NOT EXISTS series_operation ON series (operation, size);
+
+    CREATE TABLE IF NOT EXISTS measurements (
+        series_id INTEGER NOT NULL REFERENCES series (series_id),
+        stat TEXT NOT NULL,
+        run_id TEXT NOT NULL REFERENCES runs (run_id),
+        value REAL NOT NULL,
+        PRIMARY KEY (series_id, stat, run_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS measurements_run ON measurements (run_id, stat);
+
+    CREATE TABLE IF NOT EXISTS details (
+        series_id INTEGER NOT NULL REFERENCES series (series_id),
+        run_id TEXT NOT NULL REFERENCES runs (run_id),
+        details TEXT NOT NULL,
+        PRIMARY KEY (series_id, run_id)
+    ) WITHOUT ROWID;
+"""
+
+# 'benchmark' - run_tests, size to rozmiar danych; 'load' - test obciążeniowy, size to rekordy na operację;
+# 'pagination' - test stronicowania, size to numer strony
+RUN_KINDS = ('benchmark', 'load', 'pagination')
+
+# Kolumny wiersza wyników, które opisują wariant uruchomienia, a nie serię pomiarów
+DIMENSION_COLUMNS = ('indexes', 'aggregates')
+
+# Najdłuższe nazwy najpierw: 'ci_low' nie może zostać odczytane jako 'low'
+STAT_SUFFIXES = sorted(STATS, key=len, reverse=True)
+
+RESULTS_FILE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})')
+
+
+def current_git_sha(path='.'):
+    try:
+        completed = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=path, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.strip() or None
+
+
+# Znacznik czasu z losowym sufiksem: dwa uruchomienia w tej samej sekundzie (UI i CLI) dostają różne run_id
+def new_run_id(started_at=None):
+    started_at = started_at or datetime.datetime.now()
+    return f"{started_at:%Y-%m-%d_%H-%M-%S}_{uuid.uuid4().hex[:6]}"
+
+
+def config_hash(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+def variant_key(row, dimensions=DIMENSION_COLUMNS):
+    return ','.join(f'{dimension}={row[dimension]}' for dimension in sorted(dimensions)
+                    if dimension in row and not pd.isna(row[dimension]))
+
+
+# Wiersze szerokie z run_tests ({size, indexes, pg_read_avg, ...}) -> (baza, operacja, rozmiar, wariant, statystyka, wartość).
+# Baza to przedrostek kolumny serii (<baza>_<operacja>_<statystyka>) - bez stałej listy baz.
+def to_long(results, dimensions=DIMENSION_COLUMNS):
+    for row in results:
+        size = int(row['size'])
+        variant = variant_key(row, dimensions)
+        for column, value in row.items():
+            backend, _, rest = column.partition('_')
+            if not rest or column in dimensions or value is None or (isinstance(value, float) and math.isnan(value)):
+                continue
+            stat = next((stat for stat in STAT_SUFFIXES if rest.endswith(f'_{stat}')), None)
+            if stat is None:
+                continue
+            yield backend, rest[:-len(stat) - 1], size, variant, stat, float(value)
+
+
+# Statystyki opóźnień (latency_<stat>) i dodatkowe liczby wiersza jako pary (statystyka, wartość)
+def row_stats(row, extra=()):
+    for column, value in row.items():
+        if column.startswith('latency_'):
+            stat = column[len('latency_'):]
+        elif column in extra:
+            stat = column
+        else:
+            continue
+        if value is not None and not (isinstance(value, float) and math.isnan(value)):
+            yield stat, float(value)
+
+
+# Wiersze testu obciążeniowego (medbase.load.run_load): seria ('pg', 'load_read', rekordy na operację, 'concurrency=8')
+def load_to_long(results, records_per_operation):
+    for row in results:
+        for stat, value in row_stats(row, extra=('count', 'errors', 'throughput')):
+            yield row['backend'], f"load_{row['operation']}", int(records_per_operation), \
+                f"concurrency={row['concurrency']}", stat, value
+
+
+# Wiersze testu stronicowania: seria ('mongo', 'page_keyset', numer strony, 'page_size=100')
+def pagination_to_long(results):
+    for row in results:
+        for stat, value in row_stats(row, extra=('rows',)):
+            yield row['backend'], f"page_{row['mode']}", int(row['page']), f"page_size={row['page_size']}", stat, value
+
+
+class ResultsStore:
+    def __init__(self, path='benchmark_results.sqlite'):
+        self.path = path
+        with self.connect() as connection:
+            connection.executescript(SCHEMA)
+            self._migrate(connection)
+
+    # Magazyny sprzed kolumny kind: testy obciążeniowe i stronicowania rozpoznawane po config.test
+    def _migrate(self, connection):
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(runs)")]
+        if 'kind' not in columns:
+            connection.execute("ALTER TABLE runs ADD COLUMN kind TEXT NOT NULL DEFAULT 'benchmark'")
+            connection.execute("""
+                UPDATE runs SET kind = json_extract(config, '$.test')
+                WHERE json_extract(config, '$.test') IN ('load', 'pagination')
+            """)
+
+    # Nowe połączenie na każde wywołanie - magazyn jest używany z wątków Dash i procesów zadań w tle
+    @contextmanager
+    def connect(self):
+        with closing(sqlite3.connect(self.path, timeout=30)) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                yield connection
+
+    def _series_ids(self, connection, keys):
+        connection.executemany(
+            "INSERT OR IGNORE INTO series (backend, operation, size, variant) VALUES (?, ?, ?, ?)", keys)
+        return {
+            (backend, operation, size, variant): series_id
+            for series_id, backend, operation, size, variant
+            in connection.execute("SELECT series_id, backend, operation, size, variant FROM series")
+        }
+
+    def has_run(self, run_id):
+        with self.connect() as connection:
+            return connection.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone() is not None
+
+    # Zapis całego uruchomienia w jednej transakcji; istniejące uruchomienie nigdy nie jest nadpisywane.
+    # details: plany i liczniki punktów pomiaru ({backend, operation, size, indexes, aggregates, report});
+    # long_rows: wiersze już w formacie długim (np. load_to_long) zamiast szerokich wierszy run_tests
+    def save_run(self, results, run_id=None, started_at=None, config=None, git_sha=None, details=None, long_rows=None,
+                 kind='benchmark'):
+        if kind not in RUN_KINDS:
+            raise ValueError(f"Unknown run kind: {kind}")
+        started_at = started_at or datetime.datetime.now()
+        run_id = run_id or new_run_id(started_at)
+        rows = list(to_long(results) if long_rows is None else long_rows)
+        details = [((point['backend'], point['operation'], int(point['size']), variant_key(point)), point['report'])
+                   for point in details or []]
+
+        with self.connect() as connection:
+            if connection.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone():
+                raise ValueError(f"Run already exists: {run_id}")
+            connection.execute(
+                "INSERT INTO runs (run_id, started_at, git_sha, config, config_hash, kind) VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, started_at.isoformat(timespec='seconds'), git_sha,
+                 json.dumps(config, sort_keys=True, default=str) if config is not None else None,
+                 config_hash(config) if config is not None else None, kind)
+            )
+            series_ids = self._series_ids(connection, {row[:4] for row in rows} | {key for key, _ in details})
+            connection.executemany(
+                "INSERT INTO measurements (series_id, stat, run_id, value) VALUES (?, ?, ?, ?)",
+                [(series_ids[row[:4]], row[4], run_id, row[5]) for row in rows]
+            )
+            connection.executemany(
+                "INSERT INTO details (series_id, run_id, details) VALUES (?, ?, ?)",
+                [(series_ids[key], run_id, json.dumps(report, default=str)) for key, report in details]
+            )
+        return run_id
+
+    # Import starych plików crud_performance_results_<data>.csv; już zaimportowane są pomijane
+    def import_csv(self, path):
+        match = RESULTS_FILE_PATTERN.search(os.path.basename(path))
+        if match:
+            started_at = datetime.datetime.strptime(match.group(1), "%Y-%m-%d_%H-%M-%S")
+        else:
+            started_at = datetime.datetime.fromtimestamp(os.path.getmtime(path)).replace(microsecond=0)
+        run_id = started_at.strftime("%Y-%m-%d_%H-%M-%S")
+
+        if self.has_run(run_id):
+            return None
+
+        results = pd.read_csv(path).to_dict('records')
+        # Stare pliki nie zapisywały konfiguracji - wszystkie trafiają do jednej grupy (config_hash NULL)
+        return self.save_run(results, run_id=run_id, started_at=started_at)
+
+    def runs(self):
+        with self.connect() as connection:
+            return pd.read_sql_query("SELECT * FROM runs ORDER BY started_at", connection)
+
+    # Serie zapisane przez uruchomienia danego rodzaju
+    def operations(self, kind='benchmark'):
+        with self.connect() as connection:
+            return pd.read_sql_query("""
+                SELECT DISTINCT s.operation, s.size
+                FROM series s
+                JOIN measurements m ON m.series_id = s.series_id
+                JOIN runs r ON r.run_id = m.run_id AND r.kind = ?
+                ORDER BY s.operation, s.size
+            """, connection, params=[kind])
+
+    # Przebieg jednej statystyki w czasie dla wybranych serii (zapytanie po kluczu głównym measurements)
+    def history(self, operation, size=None, stat='avg', backend=None, variant=None, kind='benchmark'):
+        query = """
+            SELECT r.run_id, r.started_at, r.git_sha, r.config_hash,
+                   s.backend, s.operation, s.size, s.variant, m.value
+            FROM series s
+            JOIN measurements m ON m.series_id = s.series_id AND m.stat = ?
+            JOIN runs r ON r.run_id = m.run_id AND r.kind = ?
+            WHERE s.operation = ?
+        """
+        params = [stat, kind, operation]
+        for column, value in (('size', size), ('backend', backend), ('variant', variant)):
+            if value is not None:
+                query += f" AND s.{column} = ?"
+                params.append(value)
+        query += " ORDER BY r.started_at"
+
+        with self.connect() as connection:
+            return pd.read_sql_query(query, connection, params=params)
+
+    def details(self, run_id, backend, operation, size, variant):
+        with self.connect() as connection:
+            row = connection.execute("""
+                SELECT d.details
+                FROM series s
+                JOIN details d ON d.series_id = s.series_id AND d.run_id = ?
+                WHERE s.backend = ? AND s.operation = ? AND s.size = ? AND s.variant = ?
+            """, (run_id, backend, operation, size, variant)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _run_values(self, connection, run_ids, stat):
+        placeholders = ', '.join('?' * len(run_ids))
+        return pd.read_sql_query(f"""
+            SELECT m.run_id, s.backend, s.operation, s.size, s.variant, m.value
+            FROM measurements m
+            JOIN series s ON s.series_id = m.series_id
+            WHERE m.run_id IN ({placeholders}) AND m.stat = ?
+        """, connection, params=[*run_ids, stat])
+
+    # Porównanie uruchomienia (domyślnie ostatniego danego rodzaju) z medianą baseline_runs poprzednich, seria po serii;
+    # same_config - tylko uruchomienia z tą samą konfiguracją (config_hash).
+    # status: 'regression' / 'improvement', gdy zmiana przekracza threshold, inaczej 'ok'.
+    def regressions(self, run_id=None, stat='avg', baseline_runs=5, threshold=0.2, same_config=True, kind='benchmark'):
+        key = ['backend', 'operation', 'size', 'variant']
+
+        with self.connect() as connection:
+            if run_id is None:
+                latest = connection.execute(
+                    "SELECT run_id FROM runs WHERE kind = ? ORDER BY started_at DESC LIMIT 1", (kind,)).fetchone()
+                if latest is None:
+                    return pd.DataFrame()
+                run_id = latest[0]
+
+            run = connection.execute("SELECT started_at, config_hash, kind FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if run is None:
+                raise ValueError(f"Unknown run: {run_id}")
+            started_at, run_config_hash, run_kind = run
+            if same_config:
+                previous = connection.execute(
+                    "SELECT run_id FROM runs WHERE started_at < ? AND config_hash IS ? AND kind = ? "
+                    "ORDER BY started_at DESC LIMIT ?",
+                    (started_at, run_config_hash, run_kind, baseline_runs))
+            else:
+                previous = connection.execute(
+                    "SELECT run_id FROM runs WHERE started_at < ? AND kind = ? ORDER BY started_at DESC LIMIT ?",
+                    (started_at, run_kind, baseline_runs))
+            previous = [row[0] for row in previous]
+
+            current = self._run_values(connection, [run_id], stat)
+            if not previous:
+                return pd.DataFrame()
+            baseline = self._run_values(connection, previous, stat)
+
+        baseline = baseline.groupby(key, as_index=False).agg(baseline=('value', 'median'), baseline_runs=('run_id', 'nunique'))
+        compared = current.drop(columns='run_id').merge(baseline, on=key)
+        compared['change'] = (compared['value'] / compared['baseline'] - 1).where(compared['baseline'] > 0)
+        compared['status'] = 'ok'
+        compared.loc[compared['change'] > threshold, 'status'] = 'regression'
+        compared.loc[compared['change'] < -threshold, 'status'] = 'improvement'
+        compared.insert(0, 'run_id', run_id)
+        return compared.sort_values('change', ascending=False).reset_index(drop=True)
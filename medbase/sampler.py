@@ -0,0 +1,88 @@
+import random
+import threading
+
+
+# Indeks żywych patient_id trzymany w procesie: granice min/max i mapa bitowa.
+# Losowanie n identyfikatorów nie wymaga skanowania bazy (w przeciwieństwie do
+# ORDER BY RANDOM() w PostgreSQL i $sample w MongoDB).
+class IdSampler:
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+        self.lock = threading.Lock()
+        self.bitmap = bytearray()
+        self.count = 0
+        # Granice mogą być luźne po usunięciach - losowanie i tak sprawdza mapę bitową
+        self.min_id = None
+        self.max_id = None
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, patient_id):
+        return self._is_live(patient_id)
+
+    def _is_live(self, patient_id):
+        index = patient_id >> 3
+        return 0 <= patient_id and index < len(self.bitmap) and bool(self.bitmap[index] & (1 << (patient_id & 7)))
+
+    def add(self, patient_ids):
+        with self.lock:
+            for patient_id in patient_ids:
+                patient_id = int(patient_id)
+                if patient_id < 0:
+                    raise ValueError(f"patient_id must be non-negative, got {patient_id}")
+
+                index = patient_id >> 3
+                if index >= len(self.bitmap):
+                    self.bitmap.extend(bytes(max(index + 1 - len(self.bitmap), len(self.bitmap))))
+
+                mask = 1 << (patient_id & 7)
+                if not self.bitmap[index] & mask:
+                    self.bitmap[index] |= mask
+                    self.count += 1
+                    self.min_id = patient_id if self.min_id is None else min(self.min_id, patient_id)
+                    self.max_id = patient_id if self.max_id is None else max(self.max_id, patient_id)
+
+    def discard(self, patient_ids):
+        with self.lock:
+            for patient_id in patient_ids:
+                patient_id = int(patient_id)
+                if self._is_live(patient_id):
+                    self.bitmap[patient_id >> 3] &= ~(1 << (patient_id & 7)) & 0xFF
+                    self.count -= 1
+
+            if self.count == 0:
+                self.min_id = self.max_id = None
+
+    def clear(self):
+        with self.lock:
+            self.bitmap = bytearray()
+            self.count = 0
+            self.min_id = self.max_id = None
+
+    def live_ids(self):
+        if self.min_id is None:
+            return []
+        live_ids = [patient_id for patient_id in range(self.min_id, self.max_id + 1) if self._is_live(patient_id)]
+        # Przy okazji zawężamy granice, które mogły się rozluźnić po usunięciach
+        if live_ids:
+            self.min_id, self.max_id = live_ids[0], live_ids[-1]
+        return live_ids
+
+    def sample(self, num_records):
+        with self.lock:
+            if num_records <= 0 or self.count == 0:
+                return []
+
+            id_range = self.max_id - self.min_id + 1
+            # Przy dużym n albo rzadkiej mapie losowanie z odrzucaniem traci sens - wybieramy z listy żywych id
+            if num_records * 2 >= self.count or self.count * 4 < id_range:
+                live_ids = self.live_ids()
+                return self.rng.sample(live_ids, min(num_records, len(live_ids)))
+
+            chosen = set()
+            while len(chosen) < num_records:
+                patient_id = self.rng.randint(self.min_id, self.max_id)
+                if self._is_live(patient_id):
+                    chosen.add(patient_id)
+            return list(chosen)
@@ -0,0 +1,46 @@
+import math
+
+import numpy as np
+
+STATS = ('avg', 'min', 'median', 'p95', 'p99', 'std', 'ci_low', 'ci_high', 'outliers')
+
+# Wartości krytyczne rozkładu t-Studenta dla 95% przedziału ufności (df = 1..30); powyżej ~1.96
+T_CRITICAL_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+
+def t_critical_95(df):
+    if df <= len(T_CRITICAL_95):
+        return T_CRITICAL_95[df - 1]
+    return 1.96
+
+
+# Statystyki rozkładu czasów jednej serii (baza, operacja, rozmiar)
+def summarize(times):
+    values = np.asarray(times, dtype=float)
+    if values.size == 0:
+        return {stat: math.nan for stat in STATS}
+
+    avg = float(values.mean())
+    std = float(values.std(ddof=1)) if values.size > 1 else 0.0
+    half_width = t_critical_95(values.size - 1) * std / math.sqrt(values.size) if values.size > 1 else 0.0
+    p25, median, p75, p95, p99 = np.percentile(values, [25, 50, 75, 95, 99])
+
+    # Obserwacje odstające wg reguły Tukeya (poza 1.5 * IQR)
+    iqr = p75 - p25
+    outliers = int(((values < p25 - 1.5 * iqr) | (values > p75 + 1.5 * iqr)).sum())
+
+    return {
+        'avg': avg,
+        'min': float(values.min()),
+        'median': float(median),
+        'p95': float(p95),
+        'p99': float(p99),
+        'std': std,
+        'ci_low': avg - half_width,
+        'ci_high': avg + half_width,
+        'outliers': outliers,
+    }
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from medbase.documents import DOCUMENT_FIELDS
+
+# Kolumny generowane syntetycznie - te same, z których budowane są dokumenty i tabele
+SYNTHETIC_COLUMNS = [column for _, _, column, _ in DOCUMENT_FIELDS]
+
+
+# Empiryczny rozkład brzegowy każdej kolumny: (wartości, prawdopodobieństwa)
+def fit_marginals(frame, columns=SYNTHETIC_COLUMNS):
+    marginals = {}
+    for column in columns:
+        counts = frame[column].dropna().value_counts(normalize=True, sort=False)
+        marginals[column] = (counts.index.to_numpy(), counts.to_numpy())
+    return marginals
+
+
+def load_marginals(filepath, columns=SYNTHETIC_COLUMNS, nrows=None):
+    return fit_marginals(pd.read_csv(filepath, usecols=columns, nrows=nrows), columns)
+
+
+# Każda kolumna losowana niezależnie, całymi wektorami (rng.choice) - korelacje między kolumnami
+# nie są zachowane, rozkład każdej z nich tak
+def generate_patients(marginals, num_rows, rng):
+    return pd.DataFrame({
+        column: rng.choice(values, size=num_rows, p=probabilities)
+        for column, (values, probabilities) in marginals.items()
+    })
+
+
+# Powtarzalny strumień: każda iteracja zaczyna od tego samego ziarna, więc daje te same wiersze,
+# a w pamięci jest tylko jedna paczka naraz
+class SyntheticPatients:
+    def __init__(self, marginals, num_rows, seed=0, chunk_size=100000):
+        self.marginals = marginals
+        self.num_rows = num_rows
+        self.seed = seed
+        self.chunk_size = chunk_size
+
+    def frames(self):
+        rng = np.random.default_rng(self.seed)
+        remaining = self.num_rows
+        while remaining > 0:
+            size = min(self.chunk_size, remaining)
+            yield generate_patients(self.marginals, size, rng)
+            remaining -= size
+
+    # Rekordy jak z stream_data_from_csv - dla ścieżek wstawiających wiersz po wierszu
+    def __iter__(self):
+        for frame in self.frames():
+            yield from frame.to_dict('records')
+
+    def __len__(self):
+        return self.num_rows
@@ -0,0 +1,82 @@
+import struct
+
+import numpy as np
+
+# Tabele schematu relacyjnego: (kolumna w bazie, kolumna w CSV, typ)
+TABLE_COLUMNS = {
+    "patients": [
+        ("sex", "Sex", "int32"),
+        ("age", "Age", "int32"),
+        ("education", "Education", "int32"),
+        ("income", "Income", "int32"),
+    ],
+    "health_status": [
+        ("gen_health", "GenHlth", "int32"),
+        ("ment_health_days", "MentHlth", "int32"),
+        ("phys_health_days", "PhysHlth", "int32"),
+        ("difficulty_walking", "DiffWalk", "bool"),
+    ],
+    "lifestyle": [
+        ("physical_activity", "PhysActivity", "bool"),
+        ("smoker", "Smoker", "bool"),
+        ("fruits", "Fruits", "bool"),
+        ("veggies", "Veggies", "bool"),
+    ],
+    "diseases": [
+        ("heart_disease", "HeartDiseaseorAttack", "bool"),
+        ("stroke", "Stroke", "bool"),
+        ("diabetes", "Diabetes", "bool"),
+        ("high_blood_pressure", "HighBP", "bool"),
+        ("high_cholesterol", "HighChol", "bool"),
+    ],
+}
+
+# Binarny format COPY: int32 -> int4 (4 bajty), bool -> bool (1 bajt)
+PG_BINARY_TYPES = {
+    "int32": (">i4", 4),
+    "bool": ("u1", 1),
+}
+
+PG_COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+
+
+def table_columns(table):
+    return ["patient_id"] + [name for name, _, _ in TABLE_COLUMNS[table]]
+
+
+def split_patient_tables(data, first_patient_id=0):
+    # Jedno rzutowanie całej ramki, potem tylko wybór kolumn dla każdej tabeli
+    dtypes = {source: dtype for columns in TABLE_COLUMNS.values() for _, source, dtype in columns}
+    typed = data[list(dtypes)].astype(dtypes)
+    patient_ids = np.arange(first_patient_id, first_patient_id + len(typed), dtype="int32")
+
+    tables = {}
+    for table, columns in TABLE_COLUMNS.items():
+        frame = typed[[source for _, source, _ in columns]]
+        frame = frame.set_axis([name for name, _, _ in columns], axis=1)
+        frame.insert(0, "patient_id", patient_ids)
+        tables[table] = frame.reset_index(drop=True)
+    return tables
+
+
+def pg_binary_copy_bytes(frame):
+    # Każdy wiersz ma stałą szerokość, więc cały plik składamy jedną tablicą strukturalną NumPy
+    binary_types = {name: PG_BINARY_TYPES[str(frame[name].dtype)] for name in frame.columns}
+
+    fields = [("field_count", ">i2")]
+    for name, (pg_dtype, _) in binary_types.items():
+        fields.append((f"{name}_length", ">i4"))
+        fields.append((name, pg_dtype))
+
+    rows = np.empty(len(frame), dtype=np.dtype(fields))
+    rows["field_count"] = len(binary_types)
+    for name, (_, size) in binary_types.items():
+        rows[f"{name}_length"] = size
+        rows[name] = frame[name].to_numpy()
+
+    return PG_COPY_SIGNATURE + struct.pack(">ii", 0, 0) + rows.tobytes() + struct.pack(">h", -1)
+
+
+def write_pg_binary_copy(frame, path):
+    with open(path, "wb") as f:
+        f.write(pg_binary_copy_bytes(frame))
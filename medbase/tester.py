@@ -0,0 +1,1479 @@
+import csv
+import datetime
+import io
+import json
+import os
+import random
+import threading
+import timeit
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from itertools import chain, islice, product
+
+import pandas as pd
+import sqlalchemy
+from pymongo import MongoClient, ASCENDING, UpdateOne
+from pymongo.write_concern import WriteConcern
+from sqlalchemy import text
+
+from medbase.documents import build_patient_documents
+from medbase.tables import TABLE_COLUMNS, table_columns, split_patient_tables, pg_binary_copy_bytes
+from medbase.synthetic import SyntheticPatients, load_marginals
+from medbase.sampler import IdSampler
+from medbase.ids import LocalIdAllocator, MongoCounterIdAllocator, PostgresSequenceIdAllocator
+from medbase.connections import AcquireTimer, MongoPoolTimingListener
+from medbase.metrics import OperationMetrics, PeakRssMonitor, ReadProbe
+from medbase.instrumentation import Instrumentation
+from medbase.aggregates import (MONGO_STATS_COLLECTION, PG_STATS_TABLE, PG_STATS_REBUILD, PG_STATS_DELTA,
+                                PG_QUERY_1_PRECOMPUTED, PG_QUERY_2_PRECOMPUTED, mongo_stats_rebuild_pipeline,
+                                mongo_stats_delta_pipeline, mongo_query_1_precomputed_pipeline,
+                                mongo_query_2_precomputed_pipeline)
+from medbase.load import build_operations, run_load
+from medbase.stats import summarize
+from medbase.registry import OperationRegistry, run_operation, time_operation
+from medbase.results_store import ResultsStore, current_git_sha, load_to_long, new_run_id, pagination_to_long
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+# Historia wyników wszystkich uruchomień (medbase.results_store)
+RESULTS_STORE_PATH = 'benchmark_results.sqlite'
+
+# Zrzuty profilera: profiles/<run_id>/<baza>_<operacja>_<rozmiar>_<indeksy>_<podsumowania>.prof|.html
+PROFILES_DIRECTORY = 'profiles'
+
+class DatabaseTester:
+    BACKENDS = ('mongo', 'pg')
+
+    # 'memory' - licznik w procesie zasiany raz przez MAX(patient_id),
+    # 'shared' - SEQUENCE w PostgreSQL i dokument-licznik w MongoDB (kilka procesów ładujących naraz)
+    ID_ALLOCATION_MODES = ('memory', 'shared')
+
+    DEFAULT_POOL_OPTIONS = {
+        'pg_pool_size': 5,
+        'pg_max_overflow': 10,
+        'pg_pool_timeout': 30,
+        'pg_pool_recycle': 1800,
+        'pg_pool_pre_ping': True,
+        'mongo_max_pool_size': 100,
+        'mongo_min_pool_size': 0,
+        'mongo_max_idle_time_ms': None,
+    }
+
+    def __init__(self, id_allocation='memory', id_block_size=10000, pool_options=None, instrument=(), profiler=None):
+        self.pool_options = {**self.DEFAULT_POOL_OPTIONS, **(pool_options or {})}
+        self.acquire_timer = AcquireTimer()
+        self.operation_metrics = OperationMetrics()
+        # Liczniki serwera, plany zapytań i fazy czasu dla każdej operacji (medbase.instrumentation),
+        # profiler - zrzut cProfile / pyinstrument każdej operacji w dodatkowej iteracji; domyślnie wyłączone
+        self.instrumentation = Instrumentation(instrument, profiler=profiler)
+        self.phases = self.instrumentation.phases
+        self.pg_local = threading.local()
+        self.connection_lock = threading.Lock()
+        self._mongo_client = None
+        self._pg_engine = None
+
+        # Przydział id tworzony przy pierwszym użyciu - tryb 'shared' potrzebuje połączeń z bazami
+        if id_allocation not in self.ID_ALLOCATION_MODES:
+            raise ValueError(f"Unknown id allocation mode: {id_allocation}")
+        self.id_allocation = id_allocation
+        self.id_block_size = id_block_size
+        self.allocator_lock = threading.Lock()
+        self._mongo_id_allocator = None
+        self._pg_id_allocator = None
+
+        self.registry = self.register_default_operations(OperationRegistry())
+
+        # Próbniki żywych patient_id, wypełniane jednym odczytem z bazy przed mierzonym przebiegiem (seed_id_samplers)
+        self.random = random.Random()
+        self.mongo_ids = None
+        self.pg_ids = None
+
+        # Rozkłady kolumn dla generatora syntetycznego, liczone przy pierwszym użyciu
+        self.marginals = None
+
+        # 'adhoc' - zapytania złożone liczone od zera, 'precomputed' - podsumowanie utrzymywane przy zapisach
+        self.aggregate_mode = 'adhoc'
+
+    # Klient MongoDB i silnik PostgreSQL tworzone przy pierwszym użyciu - uruchomienie tylko z jedną bazą
+    # nie potrzebuje drugiej
+    @property
+    def mongo_client(self):
+        if self._mongo_client is None:
+            with self.connection_lock:
+                if self._mongo_client is None:
+                    options = self.pool_options
+                    self._mongo_client = MongoClient(
+                        "mongodb://localhost:27017/",
+                        maxPoolSize=options['mongo_max_pool_size'],
+                        minPoolSize=options['mongo_min_pool_size'],
+                        maxIdleTimeMS=options['mongo_max_idle_time_ms'],
+                        event_listeners=[MongoPoolTimingListener(self.acquire_timer),
+                                         *self.instrumentation.mongo_listeners()]
+                    )
+                    self.instrumentation.attach_mongo(self._mongo_client)
+        return self._mongo_client
+
+    @property
+    def mongo_db(self):
+        return self.mongo_client["heart_disease_db"]
+
+    @property
+    def mongo_collection(self):
+        return self.mongo_db["patients"]
+
+    @property
+    def pg_engine(self):
+        if self._pg_engine is None:
+            with self.connection_lock:
+                if self._pg_engine is None:
+                    options = self.pool_options
+                    # Sterownik podany jawnie: SQLAlchemy 2.1 domyślnie wybiera psycopg 3, a ścieżki
+                    # execute_values / copy_expert na surowym połączeniu wymagają psycopg2
+                    self._pg_engine = sqlalchemy.create_engine(
+                        "postgresql+psycopg2://postgres@localhost:5432/db_heart_disease",
+                        pool_size=options['pg_pool_size'],
+                        max_overflow=options['pg_max_overflow'],
+                        pool_timeout=options['pg_pool_timeout'],
+                        pool_recycle=options['pg_pool_recycle'],
+                        pool_pre_ping=options['pg_pool_pre_ping']
+                    )
+                    self.instrumentation.attach_pg(self._pg_engine)
+        return self._pg_engine
+
+    @property
+    def mongo_id_allocator(self):
+        if self._mongo_id_allocator is None:
+            with self.allocator_lock:
+                if self._mongo_id_allocator is None:
+                    if self.id_allocation == 'memory':
+                        self._mongo_id_allocator = LocalIdAllocator(self.get_max_patient_id_mongo, block_size=self.id_block_size)
+                    else:
+                        self._mongo_id_allocator = MongoCounterIdAllocator(self.mongo_db, self.mongo_collection,
+                                                                           block_size=self.id_block_size)
+        return self._mongo_id_allocator
+
+    @property
+    def pg_id_allocator(self):
+        if self._pg_id_allocator is None:
+            with self.allocator_lock:
+                if self._pg_id_allocator is None:
+                    if self.id_allocation == 'memory':
+                        self._pg_id_allocator = LocalIdAllocator(self.get_max_patient_id_pg, block_size=self.id_block_size)
+                    else:
+                        self._pg_id_allocator = PostgresSequenceIdAllocator(self.pg_engine, block_size=self.id_block_size)
+        return self._pg_id_allocator
+
+    # Połączenia PostgreSQL
+
+    # Jedno połączenie na wątek przez całe uruchomienie testów zamiast connect()/close() w każdej metodzie
+    @contextmanager
+    def pg_session(self):
+        if getattr(self.pg_local, 'connection', None) is not None:
+            yield self.pg_local.connection
+            return
+
+        start_time = timeit.default_timer()
+        connection = self.pg_engine.connect()
+        self.acquire_timer.add('pg', timeit.default_timer() - start_time)
+
+        self.pg_local.connection = connection
+        try:
+            yield connection
+        finally:
+            self.pg_local.connection = None
+            connection.close()
+
+    # Każda operacja to jawna transakcja: commit po sukcesie, rollback po błędzie
+    @contextmanager
+    def pg_connection(self):
+        connection = getattr(self.pg_local, 'connection', None)
+        owned = connection is None
+        if owned:
+            start_time = timeit.default_timer()
+            connection = self.pg_engine.connect()
+            self.acquire_timer.add('pg', timeit.default_timer() - start_time)
+
+        try:
+            with connection.begin():
+                yield connection
+        finally:
+            if owned:
+                connection.close()
+
+    # Surowe połączenie DBAPI dla COPY (copy_expert) i execute_values - tylko psycopg2
+    def pg_raw_connection(self):
+        if self.pg_engine.dialect.driver != 'psycopg2':
+            raise ValueError(f"COPY and execute_values need the psycopg2 driver, got {self.pg_engine.dialect.driver}")
+        start_time = timeit.default_timer()
+        connection = self.pg_engine.raw_connection()
+        self.acquire_timer.add('pg', timeit.default_timer() - start_time)
+        return connection
+
+    # Czas operacji bez czasu pobierania połączeń z puli, oraz ten czas osobno.
+    # Instrumentacja (liczniki, plany) działa przed i po mierzonym odcinku.
+    def measure(self, backend, operation, *args, **kwargs):
+        with self.instrumentation.observe(backend, self.operation_metrics) as observation:
+            self.acquire_timer.take(backend)
+            self.operation_metrics.take()
+            start_time = timeit.default_timer()
+            operation(*args, **kwargs)
+            elapsed = timeit.default_timer() - start_time
+            acquire_time = self.acquire_timer.take(backend)
+            observation.elapsed = elapsed - acquire_time
+        return elapsed - acquire_time, acquire_time
+
+    # Strumieniowe wczytywanie - w pamięci jest tylko jeden fragment pliku naraz
+    def stream_data_from_csv(self, filepath, chunksize=10000):
+        for chunk in pd.read_csv(filepath, chunksize=chunksize):
+            yield from chunk.to_dict('records')
+
+    def stream_data_from_json(self, filepath, buffer_size=65536):
+        with open(filepath) as json_file:
+            # JSON Lines: jeden rekord w każdej linii
+            if filepath.endswith('.jsonl'):
+                for line in json_file:
+                    if line.strip():
+                        yield json.loads(line)
+                return
+
+            # Tablica JSON (np. zapisana z indent=4): dekodujemy kolejne elementy przyrostowo
+            decoder = json.JSONDecoder()
+            buffer = ''
+            started = False
+            eof = False
+
+            while True:
+                buffer = buffer.lstrip(' \t\r\n,')
+                if not started and buffer.startswith('['):
+                    started = True
+                    buffer = buffer[1:].lstrip(' \t\r\n,')
+                if started and buffer.startswith(']'):
+                    return
+
+                if buffer and started:
+                    try:
+                        record, end = decoder.raw_decode(buffer)
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                    else:
+                        yield record
+                        buffer = buffer[end:]
+                        continue
+
+                if eof:
+                    if buffer.strip():
+                        raise ValueError(f"Unexpected content in {filepath}")
+                    return
+
+                chunk = json_file.read(buffer_size)
+                if not chunk:
+                    eof = True
+                buffer += chunk
+
+    def take_records(self, stream, num_records):
+        return list(islice(stream, num_records))
+
+    # Liczba rekordów w pliku danych (CSV liczony po jednej kolumnie, JSON strumieniowo)
+    def count_file_records(self, filepath):
+        if filepath.endswith('.csv'):
+            return sum(len(chunk) for chunk in pd.read_csv(filepath, usecols=[0], chunksize=100000))
+        return sum(1 for _ in self.stream_data_from_json(filepath))
+
+    # Losowanie identyfikatorów
+
+    def mongo_id_sampler(self):
+        if self.mongo_ids is None:
+            self.mongo_ids = IdSampler(self.random)
+            self.mongo_ids.add(doc['patient_id'] for doc in self.mongo_collection.find({}, {"patient_id": 1, "_id": 0}))
+        return self.mongo_ids
+
+    def pg_id_sampler(self):
+        if self.pg_ids is None:
+            self.pg_ids = IdSampler(self.random)
+            with self.pg_connection() as connection:
+                self.pg_ids.add(row[0] for row in connection.execute(text("SELECT patient_id FROM patients")))
+        return self.pg_ids
+
+    # Pełny odczyt id przed mierzonym przebiegiem, poza pomiarem czasu
+    def seed_id_samplers(self, backends=BACKENDS):
+        if 'mongo' in backends:
+            self.mongo_id_sampler()
+        if 'pg' in backends:
+            self.pg_id_sampler()
+
+    # Próbnik dla mierzonych operacji - nigdy nie jest budowany w ich trakcie
+    def live_ids(self, backend):
+        ids = getattr(self, f'{backend}_ids', None)
+        if ids is None:
+            raise ValueError(f"Id sampler for {backend} is not seeded (seed_id_samplers)")
+        return ids
+
+    # MongoDB  
+
+    def get_max_patient_id_mongo(self):
+        last_record = self.mongo_collection.find_one(sort=[("patient_id", -1)])
+        return last_record['patient_id'] if last_record else 0
+    
+    # Dokumenty budowane paczkami przez wspólny, wektorowy builder z medbase.documents
+    def mongo_document_batches(self, data1, num_records, batch_size):
+        first_patient_id = self.mongo_id_allocator.allocate(num_records)
+        offset = 0
+
+        for records in batched(islice(data1, num_records), batch_size):
+            with self.phases.phase('prepare'):
+                patient_documents = build_patient_documents(pd.DataFrame.from_records(records), first_patient_id + offset)
+            yield patient_documents
+            offset += len(records)
+
+    def insert_mongo_from_file(self, data1, num_records, batch_size=1000):
+        for patient_documents in self.mongo_document_batches(data1, num_records, batch_size):
+            for patient_document in patient_documents:
+                self.mongo_collection.insert_one(patient_document)
+            self.apply_mongo_stats_delta([document['patient_id'] for document in patient_documents], 1)
+            if self.mongo_ids is not None:
+                self.mongo_ids.add(document['patient_id'] for document in patient_documents)
+
+    # Wstawianie paczkami przez insert_many; write_concern np. {"w": 1, "j": False} lub {"w": 0}
+    def insert_mongo_bulk(self, data1, num_records, batch_size=1000, ordered=True, write_concern=None):
+        collection = self.mongo_collection
+        if write_concern is not None:
+            collection = collection.with_options(write_concern=WriteConcern(**write_concern))
+
+        for patient_documents in self.mongo_document_batches(data1, num_records, batch_size):
+            if patient_documents:
+                collection.insert_many(patient_documents, ordered=ordered)
+                self.apply_mongo_stats_delta([document['patient_id'] for document in patient_documents], 1)
+                if self.mongo_ids is not None:
+                    self.mongo_ids.add(document['patient_id'] for document in patient_documents)
+
+    # Masowe ładowanie gotowych ramek: dokumenty budowane wektorowo dla całej ramki, insert_many bez kolejności
+    def load_mongo_frames(self, frames, batch_size=10000):
+        for frame in frames:
+            patient_documents = build_patient_documents(frame, self.mongo_id_allocator.allocate(len(frame)))
+            for documents in batched(patient_documents, batch_size):
+                self.mongo_collection.insert_many(documents, ordered=False)
+            self.apply_mongo_stats_delta([document['patient_id'] for document in patient_documents], 1)
+
+            if self.mongo_ids is not None:
+                self.mongo_ids.add(document['patient_id'] for document in patient_documents)
+
+    # 'materialize' - cały wynik jako lista, 'stream' - przetwarzanie paczkami prosto z kursora
+    READ_MODES = ('materialize', 'stream')
+
+    def read_mongo(self, limit, mode='materialize', batch_size=1000):
+        # Kursor wysyła find przy pierwszym pobraniu - czas find i getMore jest odejmowany od 'materialize'
+        with self.phases.phase('materialize'):
+            if mode == 'materialize':
+                result = list(self.mongo_collection.find().limit(limit))
+            elif mode == 'stream':
+                # Kursor pobiera po batch_size dokumentów; projekcja pomija _id, jak odczyt w PostgreSQL
+                cursor = self.mongo_collection.find({}, {"_id": 0}).limit(limit).batch_size(batch_size)
+                with ReadProbe(self.operation_metrics) as probe:
+                    result = sum(1 for _ in probe.rows(cursor))
+            else:
+                raise ValueError(f"Unknown read mode: {mode}")
+        return result
+    
+    # 'offset' - pomijanie (page - 1) * page_size rekordów, 'keyset' - patient_id > ostatnie widziane
+    PAGINATION_MODES = ('offset', 'keyset')
+
+    # Jedna strona dokumentów posortowanych po patient_id; zwraca patient_id kolejnych dokumentów
+    def read_page_mongo(self, page_size, mode='keyset', page=1, last_seen=0):
+        if mode == 'offset':
+            cursor = self.mongo_collection.find().sort("patient_id", ASCENDING).skip((page - 1) * page_size)
+        elif mode == 'keyset':
+            cursor = self.mongo_collection.find({"patient_id": {"$gt": last_seen}}).sort("patient_id", ASCENDING)
+        else:
+            raise ValueError(f"Unknown pagination mode: {mode}")
+
+        with self.phases.phase('materialize'):
+            return [document['patient_id'] for document in cursor.limit(page_size)]
+
+    MONGO_UPDATE_MODES = ('per_document', 'update_many', 'bulk_write')
+
+    # patient_ids losowane przed pomiarem (bez $sample - z próbnika w pamięci), jak w update_postgresql
+    def update_mongo(self, patient_ids, mode='per_document'):
+        if mode not in self.MONGO_UPDATE_MODES:
+            raise ValueError(f"Unknown MongoDB update mode: {mode}")
+
+        # Podsumowanie: pacjenci wychodzą ze starej grupy dochodu i wchodzą do nowej
+        self.apply_mongo_stats_delta(patient_ids, -1)
+
+        if mode == 'per_document':
+            for patient_id in patient_ids:
+                # Zwiększ pole 'income' o 1 dla każdego pacjenta
+                self.mongo_collection.update_one(
+                    {"patient_id": patient_id}, 
+                    {"$inc": {"demographics.income": 1}}
+                )
+        elif mode == 'update_many':
+            # Jedno polecenie dla całego zbioru, jak UPDATE ... WHERE patient_id = ANY(...) w PostgreSQL
+            self.mongo_collection.update_many(
+                {"patient_id": {"$in": patient_ids}},
+                {"$inc": {"demographics.income": 1}}
+            )
+        elif mode == 'bulk_write':
+            if patient_ids:
+                with self.phases.phase('prepare'):
+                    requests = [UpdateOne({"patient_id": patient_id}, {"$inc": {"demographics.income": 1}}) for patient_id in patient_ids]
+                self.mongo_collection.bulk_write(requests, ordered=False)
+
+        self.apply_mongo_stats_delta(patient_ids, 1)
+
+    
+    def delete_mongo(self, patient_ids):
+        self.apply_mongo_stats_delta(patient_ids, -1)
+        self.mongo_collection.delete_many({"patient_id": {"$in": patient_ids}})
+        self.mongo_ids.discard(patient_ids)
+
+    # licz pacjentów z wysokim cholesterolem i nadciśnieniem, pogrupowane według wykształcenia i z obliczeniem średniego wieku i dochodu.
+    def complex_query_mongo_1(self, num_records):
+        pipeline = [
+            {"$match": {
+                "diseases.high_cholesterol": True,
+                "diseases.high_blood_pressure": True
+            }},
+            {"$group": {
+                "_id": "$demographics.education",
+                "average_age": {"$avg": "$demographics.age"},
+                "average_income": {"$avg": "$demographics.income"},
+                "patient_count": {"$sum": 1}
+            }},
+            {"$sort": {"average_income": -1}},
+            {"$limit": num_records}
+        ]
+        
+        result = list(self.mongo_collection.aggregate(pipeline))
+        return result
+
+
+
+    # 'two_pass' - średnia liczona osobnym zapytaniem i wstawiana do drugiego,
+    # 'window' - jeden pipeline: średnia z $setWindowFields, porównanie przez $expr (MongoDB 5.0+)
+    MONGO_QUERY_2_MODES = ('two_pass', 'window')
+
+    def complex_query_mongo_2(self, num_records, mode='two_pass'):
+        if mode == 'two_pass':
+            # Obliczamy średni dochód pacjentów
+            avg_income_pipeline = [
+                {"$group": {
+                    "_id": None,
+                    "average_income": {"$avg": "$demographics.income"}
+                }}
+            ]
+            avg_income_result = list(self.mongo_collection.aggregate(avg_income_pipeline))
+            avg_income = avg_income_result[0]['average_income'] if avg_income_result else 0
+
+            above_average = [{"$match": {
+                "demographics.income": {"$gt": avg_income}
+            }}]
+        elif mode == 'window':
+            # Okno bez partitionBy obejmuje całą kolekcję - to odpowiednik CTE z wersji PostgreSQL
+            above_average = [
+                {"$setWindowFields": {
+                    "output": {
+                        "overall_average_income": {
+                            "$avg": "$demographics.income",
+                            "window": {"documents": ["unbounded", "unbounded"]}
+                        }
+                    }
+                }},
+                {"$match": {
+                    "$expr": {"$gt": ["$demographics.income", "$overall_average_income"]}
+                }}
+            ]
+        else:
+            raise ValueError(f"Unknown MongoDB query 2 mode: {mode}")
+
+        # Główne zapytanie
+        pipeline = above_average + [
+            {"$group": {
+                "_id": "$demographics.education",
+                "average_income": {"$avg": "$demographics.income"},
+                "patient_count": {"$sum": 1}
+            }},
+            {"$match": {
+                "patient_count": {"$gt": 5},
+                "average_income": {"$gt": 50000}
+            }},
+            {"$sort": {"average_income": -1}},
+            {"$limit": num_records}
+        ]
+
+        # $setWindowFields trzyma całą partycję w pamięci - przy dużych kolekcjach potrzebny dysk
+        options = {'allowDiskUse': True} if mode == 'window' else {}
+        result = list(self.mongo_collection.aggregate(pipeline, **options))
+        return result
+
+
+
+    # Te same wyniki co complex_query_mongo_1/2, liczone z kolekcji podsumowania
+    def complex_query_mongo_1_precomputed(self, num_records):
+        return list(self.mongo_db[MONGO_STATS_COLLECTION].aggregate(mongo_query_1_precomputed_pipeline(num_records)))
+
+    def complex_query_mongo_2_precomputed(self, num_records):
+        return list(self.mongo_db[MONGO_STATS_COLLECTION].aggregate(mongo_query_2_precomputed_pipeline(num_records)))
+
+    # PostgreSQL
+    
+    def get_max_patient_id_pg(self):
+        query = text("SELECT MAX(patient_id) FROM patients")  
+        with self.pg_connection() as connection:
+            result = connection.execute(query).fetchone()
+        
+        return result[0] if result[0] is not None else 0
+
+    def insert_postgresql_from_file(self, data, num_records):
+        first_patient_id = self.pg_id_allocator.allocate(num_records)
+
+        patients_query = text("""
+            INSERT INTO patients (patient_id, sex, age, education, income)
+            VALUES (:patient_id, :sex, :age, :education, :income)
+        """)
+        
+        lifestyle_query = text("""
+            INSERT INTO lifestyle (patient_id, smoker, physical_activity, fruits, veggies)
+            VALUES (:patient_id, :smoker, :physical_activity, :fruits, :veggies)
+        """)
+
+        health_status_query = text("""
+            INSERT INTO health_status (patient_id, gen_health, ment_health_days, phys_health_days, difficulty_walking)
+            VALUES (:patient_id, :gen_health, :ment_health_days, :phys_health_days, :difficulty_walking)
+        """)
+
+        diseases_query = text("""
+            INSERT INTO diseases (patient_id, heart_disease, stroke, diabetes, high_blood_pressure, high_cholesterol)
+            VALUES (:patient_id, :heart_disease, :stroke, :diabetes, :high_blood_pressure, :high_cholesterol)
+        """)
+
+        with self.pg_connection() as connection:
+            inserted_ids = []
+            for i, record in enumerate(islice(data, num_records)):
+
+                patient_id = first_patient_id + i
+                inserted_ids.append(patient_id)
+
+                connection.execute(patients_query, {
+                    "patient_id": patient_id,
+                    "sex": record['Sex'],
+                    "age": record['Age'],
+                    "education": record['Education'],
+                    "income": record['Income']
+                })
+
+                connection.execute(lifestyle_query, {
+                    "patient_id": patient_id,
+                    "smoker": bool(record['Smoker']),
+                    "physical_activity": bool(record['PhysActivity']),
+                    "fruits": bool(record['Fruits']),
+                    "veggies": bool(record['Veggies'])
+                })
+
+                connection.execute(health_status_query, {
+                    "patient_id": patient_id,
+                    "gen_health": record['GenHlth'],
+                    "ment_health_days": record['MentHlth'],
+                    "phys_health_days": record['PhysHlth'],
+                    "difficulty_walking": bool(record['DiffWalk'])
+                })
+
+                connection.execute(diseases_query, {
+                    "patient_id": patient_id,
+                    "heart_disease": bool(record['HeartDiseaseorAttack']),
+                    "stroke": bool(record['Stroke']),
+                    "diabetes": bool(record['Diabetes']),
+                    "high_blood_pressure": bool(record['HighBP']),
+                    "high_cholesterol": bool(record['HighChol'])
+                })
+
+            self.apply_pg_stats_delta(connection, inserted_ids, 1)
+
+        if self.pg_ids is not None:
+            self.pg_ids.add(inserted_ids)
+
+    PG_TABLES = {
+        'patients': ('patient_id', 'sex', 'age', 'education', 'income'),
+        'lifestyle': ('patient_id', 'smoker', 'physical_activity', 'fruits', 'veggies'),
+        'health_status': ('patient_id', 'gen_health', 'ment_health_days', 'phys_health_days', 'difficulty_walking'),
+        'diseases': ('patient_id', 'heart_disease', 'stroke', 'diabetes', 'high_blood_pressure', 'high_cholesterol'),
+    }
+
+    PG_INSERT_STRATEGIES = ('single', 'batched', 'copy')
+
+    def build_postgresql_rows(self, record, patient_id):
+        return {
+            'patients': (patient_id, int(record['Sex']), int(record['Age']), int(record['Education']), int(record['Income'])),
+            'lifestyle': (patient_id, bool(record['Smoker']), bool(record['PhysActivity']), bool(record['Fruits']), bool(record['Veggies'])),
+            'health_status': (patient_id, int(record['GenHlth']), int(record['MentHlth']), int(record['PhysHlth']), bool(record['DiffWalk'])),
+            'diseases': (patient_id, bool(record['HeartDiseaseorAttack']), bool(record['Stroke']), bool(record['Diabetes']),
+                         bool(record['HighBP']), bool(record['HighChol'])),
+        }
+
+    # Zwraca kolejne paczki wierszy dla wszystkich czterech tabel
+    def postgresql_batches(self, data, num_records, batch_size):
+        first_patient_id = self.pg_id_allocator.allocate(num_records)
+        records = enumerate(islice(data, num_records))
+
+        while True:
+            with self.phases.phase('prepare'):
+                batch = {table: [] for table in self.PG_TABLES}
+                for i, record in islice(records, batch_size):
+                    for table, row in self.build_postgresql_rows(record, first_patient_id + i).items():
+                        batch[table].append(row)
+            if not batch['patients']:
+                return
+            yield batch
+
+    # Wielowierszowe INSERT ... VALUES przez execute_values, jedna transakcja na paczkę
+    def insert_postgresql_batched(self, data, num_records, batch_size=1000):
+        from psycopg2.extras import execute_values
+
+        connection = self.pg_raw_connection()
+        try:
+            for batch in self.postgresql_batches(data, num_records, batch_size):
+                with connection.cursor() as cursor:
+                    for table, rows in batch.items():
+                        columns = ', '.join(self.PG_TABLES[table])
+                        execute_values(cursor, f"INSERT INTO {table} ({columns}) VALUES %s", rows, page_size=batch_size)
+                    self.apply_pg_stats_delta(cursor, [row[0] for row in batch['patients']], 1)
+                connection.commit()
+
+                if self.pg_ids is not None:
+                    self.pg_ids.add(row[0] for row in batch['patients'])
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    # COPY FROM STDIN do wszystkich czterech tabel, jedna transakcja na paczkę
+    def insert_postgresql_copy(self, data, num_records, batch_size=10000):
+        connection = self.pg_raw_connection()
+        try:
+            for batch in self.postgresql_batches(data, num_records, batch_size):
+                with connection.cursor() as cursor:
+                    for table, rows in batch.items():
+                        with self.phases.phase('prepare'):
+                            buffer = io.StringIO()
+                            csv.writer(buffer).writerows(rows)
+                            buffer.seek(0)
+
+                        # Surowe połączenie psycopg2 omija zdarzenia SQLAlchemy - COPY liczony jako oczekiwanie
+                        columns = ', '.join(self.PG_TABLES[table])
+                        with self.phases.phase('wait'):
+                            cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+                    self.apply_pg_stats_delta(cursor, [row[0] for row in batch['patients']], 1)
+                connection.commit()
+
+                if self.pg_ids is not None:
+                    self.pg_ids.add(row[0] for row in batch['patients'])
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    # Ładowanie gotowych plików z db_scripts/relational_db_script.py (--format copy / parquet)
+    def load_postgresql_tables(self, directory='data_files', file_format='copy'):
+        connection = self.pg_raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                for table in TABLE_COLUMNS:
+                    columns = ', '.join(table_columns(table))
+
+                    if file_format == 'copy':
+                        with open(os.path.join(directory, f'{table}.copy'), 'rb') as copy_file:
+                            cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT binary)", copy_file)
+                    elif file_format == 'parquet':
+                        frame = pd.read_parquet(os.path.join(directory, f'{table}.parquet'), columns=table_columns(table))
+                        buffer = io.StringIO()
+                        frame.to_csv(buffer, index=False, header=False)
+                        buffer.seek(0)
+                        cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+                    else:
+                        raise ValueError(f"Unknown table file format: {file_format}")
+            connection.commit()
+
+            # Nie wiemy, jakie id były w plikach - próbnik i przydział id zostaną zasiane ponownie
+            self.pg_ids = None
+            self.pg_id_allocator.reset()
+            if self.aggregate_mode == 'precomputed':
+                self.rebuild_postgresql_aggregates()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    # Binarny COPY prosto z ramek (np. z medbase.synthetic), bez krotek Pythona per wiersz; transakcja na ramkę
+    def load_postgresql_frames(self, frames):
+        connection = self.pg_raw_connection()
+        try:
+            for frame in frames:
+                tables = split_patient_tables(frame, self.pg_id_allocator.allocate(len(frame)))
+                with connection.cursor() as cursor:
+                    for table, table_frame in tables.items():
+                        columns = ', '.join(table_columns(table))
+                        cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT binary)",
+                                           io.BytesIO(pg_binary_copy_bytes(table_frame)))
+                    self.apply_pg_stats_delta(cursor, tables['patients']['patient_id'].tolist(), 1)
+                connection.commit()
+
+                if self.pg_ids is not None:
+                    self.pg_ids.add(tables['patients']['patient_id'].tolist())
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    def insert_postgresql(self, data, num_records, strategy='single', batch_size=1000):
+        if strategy == 'single':
+            self.insert_postgresql_from_file(data, num_records)
+        elif strategy == 'batched':
+            self.insert_postgresql_batched(data, num_records, batch_size=batch_size)
+        elif strategy == 'copy':
+            self.insert_postgresql_copy(data, num_records, batch_size=batch_size)
+        else:
+            raise ValueError(f"Unknown PostgreSQL insert strategy: {strategy}")
+
+    # Pełny rekord pacjenta z czterech tabel - wspólna część odczytów
+    PG_PATIENT_SELECT = """
+        SELECT p.patient_id, p.sex, p.age, p.education, p.income,
+               l.smoker, l.physical_activity, l.fruits, l.veggies,
+               h.gen_health, h.ment_health_days, h.phys_health_days, h.difficulty_walking,
+               d.heart_disease, d.stroke, d.diabetes, d.high_blood_pressure, d.high_cholesterol
+        FROM patients p
+        JOIN lifestyle l ON p.patient_id = l.patient_id
+        JOIN health_status h ON p.patient_id = h.patient_id
+        JOIN diseases d ON p.patient_id = d.patient_id
+    """
+
+    def read_postgresql(self, limit, mode='materialize', batch_size=1000):
+        query = text(f"{self.PG_PATIENT_SELECT} LIMIT :limit")
+
+        # 'materialize' to fetchall(): typy Pythona z psycopg2 i obiekty Row SQLAlchemy;
+        # w trybie 'stream' obejmuje też FETCH kolejnych partii z kursora po stronie serwera
+        with self.pg_connection() as connection:
+            if mode == 'materialize':
+                rows = connection.execute(query, {'limit': limit})
+                with self.phases.phase('materialize'):
+                    result = rows.fetchall()
+            elif mode == 'stream':
+                # Nazwany kursor po stronie serwera; wiersze przychodzą partiami po batch_size
+                with ReadProbe(self.operation_metrics) as probe:
+                    rows = connection.execute(query, {'limit': limit},
+                                              execution_options={'stream_results': True, 'yield_per': batch_size})
+                    with self.phases.phase('materialize'):
+                        result = sum(1 for _ in probe.rows(chain.from_iterable(rows.partitions())))
+            else:
+                raise ValueError(f"Unknown read mode: {mode}")
+        return result
+
+    # Jedna strona pacjentów posortowanych po patient_id
+    def read_page_postgresql(self, page_size, mode='keyset', page=1, last_seen=0):
+        if mode == 'offset':
+            query = text(f"{self.PG_PATIENT_SELECT} ORDER BY p.patient_id LIMIT :limit OFFSET :offset")
+            params = {'limit': page_size, 'offset': (page - 1) * page_size}
+        elif mode == 'keyset':
+            query = text(f"{self.PG_PATIENT_SELECT} WHERE p.patient_id > :last_seen ORDER BY p.patient_id LIMIT :limit")
+            params = {'limit': page_size, 'last_seen': last_seen}
+        else:
+            raise ValueError(f"Unknown pagination mode: {mode}")
+
+        with self.pg_connection() as connection:
+            rows = connection.execute(query, params)
+            with self.phases.phase('materialize'):
+                return [row.patient_id for row in rows]
+
+    def update_postgresql(self, patient_ids):
+        patients_query = text("""
+            UPDATE patients SET income = income + 1
+            WHERE patient_id = ANY(:patient_ids)
+        """)
+
+        # Podsumowanie: pacjenci wychodzą ze starej grupy dochodu i wchodzą do nowej (ta sama transakcja)
+        with self.pg_connection() as connection:
+            self.apply_pg_stats_delta(connection, patient_ids, -1)
+            connection.execute(patients_query, {'patient_ids': patient_ids})
+            self.apply_pg_stats_delta(connection, patient_ids, 1)
+
+    # Ofiary losowane przed pomiarem z próbnika w pamięci zamiast ORDER BY RANDOM() (sortowanie całej tabeli)
+    def delete_postgresql(self, patient_ids):
+        with self.pg_connection() as connection:
+            self.apply_pg_stats_delta(connection, patient_ids, -1)
+            connection.execute(text("DELETE FROM lifestyle WHERE patient_id = ANY(:patient_ids)"), {'patient_ids': patient_ids})
+            connection.execute(text("DELETE FROM health_status WHERE patient_id = ANY(:patient_ids)"), {'patient_ids': patient_ids})
+            connection.execute(text("DELETE FROM diseases WHERE patient_id = ANY(:patient_ids)"), {'patient_ids': patient_ids})
+            connection.execute(text("DELETE FROM patients WHERE patient_id = ANY(:patient_ids)"), {'patient_ids': patient_ids})
+
+        self.pg_ids.discard(patient_ids)
+
+    def complex_query_postgresql_1(self, num_records):
+        query = text("""
+            SELECT p.education, 
+                COUNT(p.patient_id) AS patient_count, 
+                AVG(p.age) AS average_age, 
+                AVG(p.income) AS average_income
+            FROM patients p
+            JOIN diseases d ON p.patient_id = d.patient_id
+            WHERE d.high_cholesterol = TRUE 
+            AND d.high_blood_pressure = TRUE
+            GROUP BY p.education
+            ORDER BY average_income DESC
+            LIMIT :num_records;
+        """)
+
+        with self.pg_connection() as connection:
+            result = connection.execute(query, {'num_records': num_records}).fetchall()
+        return result
+
+
+
+    def complex_query_postgresql_2(self, num_records):
+        query = text("""
+            WITH avg_income AS (
+                SELECT AVG(income) AS avg_income
+                FROM patients
+            ),
+            filtered_patients AS (
+                SELECT p.education, 
+                    AVG(p.income) AS average_income, 
+                    COUNT(p.patient_id) AS patient_count
+                FROM patients p
+                JOIN avg_income ai ON p.income > ai.avg_income
+                GROUP BY p.education
+            )
+            SELECT education, average_income, patient_count
+            FROM filtered_patients
+            WHERE patient_count > 5 
+            AND average_income > 50000
+            ORDER BY average_income DESC
+            LIMIT :num_records;
+        """)
+
+        with self.pg_connection() as connection:
+            result = connection.execute(query, {'num_records': num_records}).fetchall()
+        return result
+
+
+
+    def complex_query_postgresql_1_precomputed(self, num_records):
+        with self.pg_connection() as connection:
+            result = connection.execute(text(PG_QUERY_1_PRECOMPUTED), {'num_records': num_records}).fetchall()
+        return result
+
+    def complex_query_postgresql_2_precomputed(self, num_records):
+        with self.pg_connection() as connection:
+            result = connection.execute(text(PG_QUERY_2_PRECOMPUTED), {'num_records': num_records}).fetchall()
+        return result
+
+
+
+    # Indeksy
+
+    MONGO_INDEXES = [
+        ([("patient_id", ASCENDING)], {"name": "patient_id_unique", "unique": True}),
+        ([("diseases.high_cholesterol", ASCENDING), ("diseases.high_blood_pressure", ASCENDING)], {"name": "diseases_cholesterol_blood_pressure"}),
+        ([("demographics.income", ASCENDING)], {"name": "demographics_income"}),
+    ]
+
+    PG_INDEXES = {
+        'patients_patient_id_unique': "CREATE UNIQUE INDEX IF NOT EXISTS patients_patient_id_unique ON patients (patient_id)",
+        'lifestyle_patient_id_idx': "CREATE INDEX IF NOT EXISTS lifestyle_patient_id_idx ON lifestyle (patient_id)",
+        'health_status_patient_id_idx': "CREATE INDEX IF NOT EXISTS health_status_patient_id_idx ON health_status (patient_id)",
+        'diseases_patient_id_idx': "CREATE INDEX IF NOT EXISTS diseases_patient_id_idx ON diseases (patient_id)",
+        'diseases_cholesterol_blood_pressure_idx': "CREATE INDEX IF NOT EXISTS diseases_cholesterol_blood_pressure_idx ON diseases (high_cholesterol, high_blood_pressure)",
+        'patients_income_idx': "CREATE INDEX IF NOT EXISTS patients_income_idx ON patients (income)",
+    }
+
+    # Klucze obce tabel podrzędnych; NOT VALID, żeby nie sprawdzać istniejących wierszy
+    PG_FOREIGN_KEYS = ('lifestyle', 'health_status', 'diseases')
+
+    INDEX_MODES = ('indexed', 'unindexed')
+
+    def create_mongo_indexes(self):
+        for keys, options in self.MONGO_INDEXES:
+            self.mongo_collection.create_index(keys, **options)
+
+    def drop_mongo_indexes(self):
+        existing = self.mongo_collection.index_information()
+        for _, options in self.MONGO_INDEXES:
+            if options["name"] in existing:
+                self.mongo_collection.drop_index(options["name"])
+
+    def create_postgresql_indexes(self):
+        with self.pg_engine.begin() as connection:
+            for statement in self.PG_INDEXES.values():
+                connection.execute(text(statement))
+
+            for table in self.PG_FOREIGN_KEYS:
+                connection.execute(text(f"""
+                    DO $$
+                    BEGIN
+                        IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{table}_patient_id_fkey') THEN
+                            ALTER TABLE {table} ADD CONSTRAINT {table}_patient_id_fkey
+                                FOREIGN KEY (patient_id) REFERENCES patients (patient_id) NOT VALID;
+                        END IF;
+                    END $$;
+                """))
+
+    def drop_postgresql_indexes(self):
+        with self.pg_engine.begin() as connection:
+            # Najpierw klucze obce - zależą od unikalnego indeksu na patients
+            for table in self.PG_FOREIGN_KEYS:
+                connection.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_patient_id_fkey"))
+
+            for name in self.PG_INDEXES:
+                connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    def set_index_mode(self, index_mode, backends=BACKENDS):
+        if index_mode == 'indexed':
+            if 'mongo' in backends:
+                self.create_mongo_indexes()
+            if 'pg' in backends:
+                self.create_postgresql_indexes()
+        elif index_mode == 'unindexed':
+            if 'mongo' in backends:
+                self.drop_mongo_indexes()
+            if 'pg' in backends:
+                self.drop_postgresql_indexes()
+        else:
+            raise ValueError(f"Unknown index mode: {index_mode}")
+
+    # Podsumowanie dla zapytań złożonych (medbase.aggregates)
+
+    AGGREGATE_MODES = ('adhoc', 'precomputed')
+
+    # Warianty zapytań czytające podsumowanie - mierzone tylko, gdy jest utrzymywane
+    PRECOMPUTED_OPERATIONS = ('complex_query_1_precomputed', 'complex_query_2_precomputed')
+
+    def apply_mongo_stats_delta(self, patient_ids, sign):
+        if self.aggregate_mode == 'precomputed' and patient_ids:
+            self.mongo_collection.aggregate(mongo_stats_delta_pipeline(list(patient_ids), sign))
+
+    # Delta w transakcji zmiany: połączenie SQLAlchemy albo kursor DBAPI (ścieżki execute_values / COPY)
+    def apply_pg_stats_delta(self, connection, patient_ids, sign):
+        if self.aggregate_mode != 'precomputed' or not patient_ids:
+            return
+        params = {'sign': sign, 'patient_ids': list(patient_ids)}
+        if isinstance(connection, sqlalchemy.engine.Connection):
+            connection.exec_driver_sql(PG_STATS_DELTA, params)
+        else:
+            connection.execute(PG_STATS_DELTA, params)
+
+    def rebuild_mongo_aggregates(self):
+        self.mongo_collection.aggregate(mongo_stats_rebuild_pipeline())
+
+    def rebuild_postgresql_aggregates(self):
+        with self.pg_engine.begin() as connection:
+            connection.execute(text(PG_STATS_TABLE))
+            connection.execute(text("TRUNCATE patient_stats"))
+            connection.execute(text(PG_STATS_REBUILD))
+
+    def rebuild_aggregates(self, backends=BACKENDS):
+        if 'mongo' in backends:
+            self.rebuild_mongo_aggregates()
+        if 'pg' in backends:
+            self.rebuild_postgresql_aggregates()
+
+    def set_aggregate_mode(self, aggregate_mode, backends=BACKENDS):
+        if aggregate_mode == 'precomputed':
+            if self.aggregate_mode != 'precomputed':
+                self.rebuild_aggregates(backends)
+        elif aggregate_mode == 'adhoc':
+            # Nieutrzymywane podsumowanie szybko by się zdezaktualizowało - usuwamy je
+            if self.aggregate_mode != 'adhoc':
+                if 'mongo' in backends:
+                    self.mongo_db[MONGO_STATS_COLLECTION].drop()
+                if 'pg' in backends:
+                    with self.pg_engine.begin() as connection:
+                        connection.execute(text("DROP TABLE IF EXISTS patient_stats"))
+        else:
+            raise ValueError(f"Unknown aggregate mode: {aggregate_mode}")
+        self.aggregate_mode = aggregate_mode
+
+    # Stan danych - każdy pomiar startuje z tego samego, znanego zbioru
+
+    # 'iteration' - odtworzenie przed każdą iteracją, 'size' - raz na rozmiar, 'none' - dane rosną jak dotąd
+    DATASET_RESET_MODES = ('iteration', 'size', 'none')
+
+    # 'files' - rekordy z plików CSV/JSON (najwyżej tyle, ile mają pliki),
+    # 'synthetic' - dowolnie wiele wierszy z rozkładów kolumn pliku CSV (medbase.synthetic)
+    DATA_SOURCES = ('files', 'synthetic')
+
+    def synthetic_marginals(self, csv_file):
+        if self.marginals is None:
+            self.marginals = load_marginals(csv_file)
+        return self.marginals
+
+    def count_patients(self, backend):
+        if backend == 'mongo':
+            return self.mongo_collection.count_documents({})
+        with self.pg_connection() as connection:
+            return connection.execute(text("SELECT COUNT(*) FROM patients")).scalar()
+
+    # Czyści kolekcję i tabele, a potem ładuje masowo baseline_rows rekordów (insert_many / COPY),
+    # z numeracją patient_id od 1. Obie bazy dostają te same rekordy z pliku CSV, a po załadowaniu
+    # sprawdzana jest liczba pacjentów - pomiary na niepełnym zbiorze nie byłyby porównywalne.
+    # Próbniki id znają od razu cały zbiór.
+    def restore_baseline(self, baseline_rows, csv_file, batch_size=10000, data_source='files', seed=0,
+                         backends=BACKENDS):
+        if data_source not in self.DATA_SOURCES:
+            raise ValueError(f"Unknown data source: {data_source}")
+
+        if 'mongo' in backends:
+            self.mongo_collection.drop()
+            self.mongo_id_allocator.restart()
+            self.mongo_ids = IdSampler(self.random)
+        if 'pg' in backends:
+            with self.pg_connection() as connection:
+                connection.execute(text("TRUNCATE lifestyle, health_status, diseases, patients"))
+            self.pg_id_allocator.restart()
+            self.pg_ids = IdSampler(self.random)
+
+        # Podsumowanie liczone raz po załadowaniu zamiast delty dla każdej paczki
+        aggregate_mode, self.aggregate_mode = self.aggregate_mode, 'adhoc'
+        try:
+            if data_source == 'files':
+                if 'mongo' in backends:
+                    self.insert_mongo_bulk(self.stream_data_from_csv(csv_file), baseline_rows, batch_size=batch_size, ordered=False)
+                if 'pg' in backends:
+                    self.insert_postgresql_copy(self.stream_data_from_csv(csv_file), baseline_rows, batch_size=batch_size)
+            else:
+                patients = SyntheticPatients(self.synthetic_marginals(csv_file), baseline_rows, seed=seed)
+                if 'mongo' in backends:
+                    self.load_mongo_frames(patients.frames(), batch_size=batch_size)
+                if 'pg' in backends:
+                    self.load_postgresql_frames(patients.frames())
+        finally:
+            self.aggregate_mode = aggregate_mode
+
+        for backend in backends:
+            loaded = self.count_patients(backend)
+            if loaded != baseline_rows:
+                raise ValueError(f"Baseline for {backend} has {loaded} patients, expected {baseline_rows}")
+
+        # Świeże statystyki planisty po TRUNCATE i ładowaniu - autovacuum nie zmieni planów w trakcie pomiaru
+        if 'pg' in backends:
+            with self.pg_connection() as connection:
+                connection.execute(text(f"ANALYZE {', '.join(self.PG_TABLES)}"))
+
+        if aggregate_mode == 'precomputed':
+            self.rebuild_aggregates(backends)
+
+    # Operacje benchmarku - nowe zapytanie to jedno wywołanie registry.register(...). Nowa baza potrzebuje jeszcze
+    # połączenia, ładowania baseline i próbnika id (<baza>_ids) w DatabaseTester; magazyn wyników i wykresy
+    # biorą listę baz z samych wyników.
+
+    def pg_insert_series(self, strategy):
+        # strategia 'single' to dotychczasowa seria 'insert', pozostałe to 'insert_<strategia>'
+        return 'insert' if strategy == 'single' else f'insert_{strategy}'
+
+    def register_default_operations(self, registry):
+        #MongoDB
+        registry.register('mongo', 'insert', lambda context, _: self.insert_mongo_from_file(context['json_data'], context['size']))
+        registry.register('mongo', 'insert_bulk', lambda context, _: self.insert_mongo_bulk(
+            context['json_data'], context['size'], batch_size=context['mongo_batch_size'], ordered=True,
+            write_concern=context['mongo_write_concern']))
+        registry.register('mongo', 'insert_bulk_unordered', lambda context, _: self.insert_mongo_bulk(
+            context['json_data'], context['size'], batch_size=context['mongo_batch_size'], ordered=False,
+            write_concern=context['mongo_write_concern']))
+        registry.register('mongo', 'read', lambda context, _: self.read_mongo(context['size']))
+        registry.register('mongo', 'read_stream', lambda context, _: self.read_mongo(
+            context['size'], mode='stream', batch_size=context['read_batch_size']))
+        # Ofiary zmian losowane w setup, poza pomiarem czasu - tak samo dla obu baz
+        sample_mongo_ids = lambda context: self.live_ids('mongo').sample(context['size'])
+        registry.register('mongo', 'update', lambda context, patient_ids: self.update_mongo(patient_ids, mode='per_document'),
+                          setup=sample_mongo_ids)
+        registry.register('mongo', 'update_many', lambda context, patient_ids: self.update_mongo(patient_ids, mode='update_many'),
+                          setup=sample_mongo_ids)
+        registry.register('mongo', 'update_bulk', lambda context, patient_ids: self.update_mongo(patient_ids, mode='bulk_write'),
+                          setup=sample_mongo_ids)
+        registry.register('mongo', 'delete', lambda context, patient_ids: self.delete_mongo(patient_ids), setup=sample_mongo_ids)
+        registry.register('mongo', 'complex_query_1', lambda context, _: self.complex_query_mongo_1(context['size']))
+        registry.register('mongo', 'complex_query_2', lambda context, _: self.complex_query_mongo_2(context['size']))
+        registry.register('mongo', 'complex_query_2_window', lambda context, _: self.complex_query_mongo_2(
+            context['size'], mode='window'))
+        registry.register('mongo', 'complex_query_1_precomputed', lambda context, _: self.complex_query_mongo_1_precomputed(context['size']))
+        registry.register('mongo', 'complex_query_2_precomputed', lambda context, _: self.complex_query_mongo_2_precomputed(context['size']))
+
+        #PostgreSQL
+        for strategy in self.PG_INSERT_STRATEGIES:
+            registry.register('pg', self.pg_insert_series(strategy), lambda context, _, strategy=strategy: self.insert_postgresql(
+                context['csv_data'], context['size'], strategy=strategy, batch_size=context['pg_batch_size']))
+        registry.register('pg', 'read', lambda context, _: self.read_postgresql(context['size']))
+        registry.register('pg', 'read_stream', lambda context, _: self.read_postgresql(
+            context['size'], mode='stream', batch_size=context['read_batch_size']))
+        sample_pg_ids = lambda context: self.live_ids('pg').sample(context['size'])
+        registry.register('pg', 'update', lambda context, patient_ids: self.update_postgresql(patient_ids), setup=sample_pg_ids)
+        registry.register('pg', 'delete', lambda context, patient_ids: self.delete_postgresql(patient_ids), setup=sample_pg_ids)
+        registry.register('pg', 'complex_query_1', lambda context, _: self.complex_query_postgresql_1(context['size']))
+        registry.register('pg', 'complex_query_2', lambda context, _: self.complex_query_postgresql_2(context['size']))
+        registry.register('pg', 'complex_query_1_precomputed', lambda context, _: self.complex_query_postgresql_1_precomputed(context['size']))
+        registry.register('pg', 'complex_query_2_precomputed', lambda context, _: self.complex_query_postgresql_2_precomputed(context['size']))
+
+        return registry
+
+    def benchmark_context(self, size, csv_data, json_data, mongo_batch_size=1000, mongo_write_concern=None, pg_batch_size=1000,
+                          read_batch_size=1000):
+        return {
+            'size': size,
+            'csv_data': csv_data,
+            'json_data': json_data,
+            'mongo_batch_size': mongo_batch_size,
+            'mongo_write_concern': mongo_write_concern,
+            'pg_batch_size': pg_batch_size,
+            'read_batch_size': read_batch_size,
+        }
+
+    # operations: nazwy ('read') albo 'baza:nazwa' ('mongo:update_many'); None = wszystkie
+    # backends: ('mongo', 'pg') lub jedna z nich; None = obie
+    def select_operations(self, operations=None, pg_insert_strategies=PG_INSERT_STRATEGIES, backends=None):
+        excluded = {('pg', self.pg_insert_series(strategy)) for strategy in self.PG_INSERT_STRATEGIES if strategy not in pg_insert_strategies}
+        return [
+            operation for operation in self.registry.select(backends=backends)
+            if operation.key not in excluded
+            and (operations is None or operation.name in operations or f'{operation.backend}:{operation.name}' in operations)
+        ]
+
+    DEFAULT_DATA_SIZES = (10, 100, 1000, 10000)
+
+    def operations_for_mode(self, selected, aggregate_mode):
+        return [
+            operation for operation in selected
+            if aggregate_mode == 'precomputed' or operation.name not in self.PRECOMPUTED_OPERATIONS
+        ]
+
+    # Odczyty, dla których mierzony jest szczytowy przyrost RSS - w osobnym przebiegu poza pomiarem czasu
+    MEMORY_PROBED_OPERATIONS = ('read', 'read_stream')
+
+    # Jedno dodatkowe, niemierzone wykonanie operacji z próbkowaniem RSS; wynik w MB albo None (brak /proc i psutil)
+    def peak_rss(self, operation, context):
+        with PeakRssMonitor() as monitor:
+            run_operation(operation, context)
+        # Metryki zgłoszone przez ten przebieg (np. first_row) nie trafiają do wyników
+        self.operation_metrics.take()
+        return monitor.growth / 2 ** 20 if monitor.growth is not None else None
+
+    # Jeden wiersz wyników: wymiary uruchomienia + statystyki każdej serii (baza, operacja)
+    def summary_row(self, size, index_mode, aggregate_mode, times):
+        row = {"size": size, "indexes": index_mode, "aggregates": aggregate_mode}
+        for (backend, name), values in times.items():
+            for stat, value in summarize(values).items():
+                row[f"{backend}_{name}_{stat}"] = value
+        return row
+
+    # TESTS
+    def run_tests(self, num_iterations=5, warmup_iterations=1, mongo_batch_size=1000, mongo_write_concern=None,
+                  pg_insert_strategies=PG_INSERT_STRATEGIES, pg_batch_size=1000, index_modes=('indexed',),
+                  reuse_pg_session=True, result_formats=('store',), operations=None,
+                  dataset_reset='iteration', baseline_rows=None, seed=0, data_sizes=DEFAULT_DATA_SIZES,
+                  data_source='files', read_batch_size=1000, aggregate_modes=('adhoc',), progress_callback=None,
+                  run_id=None, backends=None):
+        if dataset_reset not in self.DATASET_RESET_MODES:
+            raise ValueError(f"Unknown dataset reset mode: {dataset_reset}")
+        if data_source not in self.DATA_SOURCES:
+            raise ValueError(f"Unknown data source: {data_source}")
+
+        results = []
+        # Plany, liczniki i fazy z ostatniej iteracji każdego punktu (baza, operacja, rozmiar, wariant)
+        details = {}
+        # Podany z zewnątrz run_id sprawdzany przed pomiarami, a nie dopiero przy zapisie
+        if run_id and 'store' in result_formats and ResultsStore(RESULTS_STORE_PATH).has_run(run_id):
+            raise ValueError(f"Run already exists: {run_id}")
+        run_id = run_id or new_run_id()
+
+        csv_file = 'modified_heart_disease_health_indicators.csv'
+        json_file = 'patients_data.json'
+
+        selected = self.select_operations(operations, pg_insert_strategies, backends)
+        # Przygotowanie danych, indeksów i podsumowań tylko dla baz, które mają wybrane operacje
+        active_backends = list(dict.fromkeys(operation.backend for operation in selected))
+
+        # Pliki mają skończoną liczbę rekordów - większe rozmiary tylko z generatorem syntetycznym
+        if data_source == 'files':
+            largest = max([*data_sizes, baseline_rows or 0])
+            for data_file in [csv_file] + ([json_file] if 'mongo' in active_backends else []):
+                available = self.count_file_records(data_file)
+                if largest > available:
+                    raise ValueError(f"Data size {largest} exceeds {available} records in {data_file}; "
+                                     f"use data_source='synthetic'")
+
+        # Postęp liczony w pojedynczych pomiarach operacji (razem z rozgrzewką)
+        # Z profilerem dodatkowa iteracja na końcu: każda operacja pod cProfile / pyinstrument, czasy odrzucane
+        profile_iterations = 1 if self.instrumentation.profiler else 0
+        total_steps = len(index_modes) * len(data_sizes) * (warmup_iterations + num_iterations + profile_iterations) * sum(
+            len(self.operations_for_mode(selected, aggregate_mode)) for aggregate_mode in aggregate_modes)
+        completed_steps = 0
+
+        # Jedna sesja PostgreSQL na całe uruchomienie (pool nadal obsługuje COPY/execute_values)
+        with self.pg_session() if reuse_pg_session and 'pg' in active_backends else nullcontext():
+            for index_mode, aggregate_mode, size in product(index_modes, aggregate_modes, data_sizes):
+                # Indeksy zakładane/usuwane poza pomiarem czasu (operacje idempotentne)
+                if dataset_reset == 'none':
+                    self.set_index_mode(index_mode, active_backends)
+
+                # W trybie 'precomputed' zapisy utrzymują podsumowanie (narzut widać w seriach insert/update/delete)
+                self.set_aggregate_mode(aggregate_mode, active_backends)
+                operations_for_mode = self.operations_for_mode(selected, aggregate_mode)
+
+                # Wczytujemy tylko tyle rekordów, ile potrzeba dla danego rozmiaru (poza pomiarem czasu);
+                # rekordy syntetyczne też generowane raz na rozmiar - losowanie nie trafia do czasu wstawiania
+                if data_source == 'synthetic':
+                    csv_data = json_data = self.take_records(
+                        SyntheticPatients(self.synthetic_marginals(csv_file), size, seed=seed + 1), size)
+                else:
+                    csv_data = self.take_records(self.stream_data_from_csv(csv_file), size) if 'pg' in active_backends else []
+                    json_data = self.take_records(self.stream_data_from_json(json_file), size) if 'mongo' in active_backends else []
+                context = self.benchmark_context(size, csv_data, json_data, mongo_batch_size=mongo_batch_size,
+                                                 mongo_write_concern=mongo_write_concern, pg_batch_size=pg_batch_size,
+                                                 read_batch_size=read_batch_size)
+
+                times = {operation.key: [] for operation in operations_for_mode}
+                times.update({(backend, 'connect'): [] for backend in active_backends})
+
+                for iteration in range(warmup_iterations + num_iterations + profile_iterations):
+                    # Czasy z iteracji rozgrzewkowych są odrzucane
+                    if iteration == warmup_iterations:
+                        for values in times.values():
+                            values.clear()
+
+                    # Baseline (domyślnie `size` rekordów) i indeksy odtwarzane poza pomiarem czasu;
+                    # indeksy po załadowaniu, bo drop() kolekcji usuwa też jej indeksy
+                    if dataset_reset == 'iteration' or (dataset_reset == 'size' and iteration == 0):
+                        self.restore_baseline(baseline_rows or size, csv_file, data_source=data_source, seed=seed,
+                                              backends=active_backends)
+                        self.set_index_mode(index_mode, active_backends)
+
+                    # Próbniki id gotowe przed przebiegiem (np. po dataset_reset='none' albo load_postgresql_tables);
+                    # losowanie id zależy tylko od (seed, rozmiar, iteracja)
+                    self.seed_id_samplers(active_backends)
+                    self.random.seed(f"{seed}:{size}:{iteration}")
+
+                    # EXPLAIN ANALYZE wykonuje zapytania ponownie - tylko raz na punkt, w ostatniej iteracji
+                    last_iteration = iteration == warmup_iterations + num_iterations - 1
+                    profiling = iteration >= warmup_iterations + num_iterations
+                    self.instrumentation.explain_active = last_iteration
+
+                    for operation in operations_for_mode:
+                        point = (operation.backend, operation.name, size, index_mode, aggregate_mode)
+                        if profiling:
+                            self.instrumentation.profile_path = os.path.join(
+                                PROFILES_DIRECTORY, run_id, '_'.join(map(str, point)))
+
+                        elapsed, acquire_time = time_operation(operation, context, self.measure)
+                        report = self.instrumentation.take_report()
+                        metrics = self.operation_metrics.take()
+
+                        if profiling:
+                            # Profiler spowalnia operację - z tej iteracji zostaje tylko ścieżka zrzutu
+                            if report and 'profile' in report:
+                                details.setdefault(point, {})['profile'] = report['profile']
+                        else:
+                            times[operation.key].append(elapsed)
+                            times[(operation.backend, 'connect')].append(acquire_time)
+
+                            if report and last_iteration:
+                                details.setdefault(point, {}).update(report)
+
+                            # Metryki zgłoszone przez samą operację, np. first_row_read_stream
+                            for metric, value in metrics.items():
+                                times.setdefault((operation.backend, f'{metric}_{operation.name}'), []).append(value)
+
+                            # Pamięć odczytu raz na punkt, zaraz po ostatnim pomiarze (ten sam stan danych)
+                            if last_iteration and operation.name in self.MEMORY_PROBED_OPERATIONS:
+                                growth = self.peak_rss(operation, context)
+                                if growth is not None:
+                                    times[(operation.backend, f'peak_rss_{operation.name}')] = [growth]
+
+                        # Wyniki częściowe: gotowe wiersze + bieżący rozmiar (bez iteracji rozgrzewkowych)
+                        completed_steps += 1
+                        if progress_callback is not None:
+                            partial = results + [self.summary_row(size, index_mode, aggregate_mode, times)] \
+                                if iteration >= warmup_iterations else list(results)
+                            progress_callback({
+                                "completed": completed_steps,
+                                "total": total_steps,
+                                "size": size,
+                                "indexes": index_mode,
+                                "aggregates": aggregate_mode,
+                                "iteration": iteration,
+                                "operation": f"{operation.backend}:{operation.name}",
+                                "results": partial,
+                            })
+
+                # Zapisz wyniki dla obu baz danych
+                results.append(self.summary_row(size, index_mode, aggregate_mode, times))
+
+        # Konfiguracja zapisywana razem z wynikami - regresje liczone są względem uruchomień o tych samych ustawieniach
+        config = {
+            'num_iterations': num_iterations,
+            'warmup_iterations': warmup_iterations,
+            'mongo_batch_size': mongo_batch_size,
+            'mongo_write_concern': mongo_write_concern,
+            'pg_insert_strategies': list(pg_insert_strategies),
+            'pg_batch_size': pg_batch_size,
+            'index_modes': list(index_modes),
+            'aggregate_modes': list(aggregate_modes),
+            'reuse_pg_session': reuse_pg_session,
+            'operations': operations,
+            'backends': backends,
+            'dataset_reset': dataset_reset,
+            'baseline_rows': baseline_rows,
+            'seed': seed,
+            'data_sizes': list(data_sizes),
+            'data_source': data_source,
+            'read_batch_size': read_batch_size,
+            'instrument': list(self.instrumentation.options),
+        }
+
+        # Zapis wyników do magazynu historii (SQLite) i opcjonalnie do pliku CSV / Parquet
+        details = [
+            {"backend": backend, "operation": name, "size": size, "indexes": index_mode, "aggregates": aggregate_mode,
+             "report": report}
+            for (backend, name, size, index_mode, aggregate_mode), report in details.items()
+        ]
+        self.save_results(results, formats=result_formats, config=config, run_id=run_id, details=details)
+
+        return results
+
+    # Test obciążeniowy: N współbieżnych klientów na tych samych operacjach DatabaseTester
+    def run_load_tests(self, concurrency_levels=(1, 2, 4, 8, 16), operations_per_worker=50, mix=None,
+                       records_per_operation=10, backends=('mongo', 'pg'), seed=None, result_formats=('store',),
+                       run_id=None):
+        csv_file = 'modified_heart_disease_health_indicators.csv'
+        json_file = 'patients_data.json'
+
+        # Pliki wejściowe tylko dla wybranych baz
+        csv_data = self.take_records(self.stream_data_from_csv(csv_file), records_per_operation) if 'pg' in backends else []
+        json_data = self.take_records(self.stream_data_from_json(json_file), records_per_operation) if 'mongo' in backends else []
+
+        # Próbniki zasiewamy przed startem wątków, żeby nie robił tego każdy wątek osobno
+        self.seed_id_samplers(backends)
+
+        context = self.benchmark_context(records_per_operation, csv_data, json_data,
+                                         mongo_batch_size=records_per_operation, pg_batch_size=records_per_operation)
+        operations = build_operations(self.registry, context, mix)
+        results = run_load(operations, concurrency_levels=concurrency_levels, operations_per_worker=operations_per_worker,
+                           mix=mix, backends=backends, seed=seed)
+
+        config = {
+            'concurrency_levels': list(concurrency_levels),
+            'operations_per_worker': operations_per_worker,
+            'mix': mix,
+            'records_per_operation': records_per_operation,
+            'backends': list(backends),
+            'seed': seed,
+        }
+        self.save_results(results, formats=result_formats, config=config, run_id=run_id,
+                          long_rows=load_to_long(results, records_per_operation), kind='load',
+                          filename_prefix='load_test_results')
+
+        return results
+
+    DEFAULT_PAGE_DEPTHS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+    # Opóźnienie jednej strony w funkcji jej numeru. OFFSET/skip pyta od razu o daną stronę;
+    # keyset przechodzi kolejne strony jak klient (patient_id > ostatnie widziane), mierzone są wybrane głębokości.
+    def run_pagination_tests(self, page_size=100, page_depths=DEFAULT_PAGE_DEPTHS, num_iterations=5, warmup_iterations=1,
+                             backends=('mongo', 'pg'), modes=PAGINATION_MODES, index_mode='indexed',
+                             restore_dataset=True, baseline_rows=None, data_source='synthetic', seed=0,
+                             result_formats=('store',), run_id=None):
+        csv_file = 'modified_heart_disease_health_indicators.csv'
+
+        page_depths = sorted(page_depths)
+        readers = {'mongo': self.read_page_mongo, 'pg': self.read_page_postgresql}
+
+        # Domyślnie baseline mieści dokładnie najgłębszą stronę (poza pomiarem czasu)
+        if restore_dataset:
+            self.restore_baseline(baseline_rows or page_size * page_depths[-1], csv_file,
+                                  data_source=data_source, seed=seed, backends=backends)
+        self.set_index_mode(index_mode, backends)
+
+        times = defaultdict(list)
+        page_rows = {}
+
+        with self.pg_session() if 'pg' in backends else nullcontext():
+            for iteration in range(warmup_iterations + num_iterations):
+                if iteration == warmup_iterations:
+                    times.clear()
+
+                for backend, mode in product(backends, modes):
+                    read_page = readers[backend]
+                    last_seen = 0
+                    for page in range(1, page_depths[-1] + 1):
+                        if mode == 'offset' and page not in page_depths:
+                            continue
+
+                        page_ids = []
+                        elapsed, _ = self.measure(backend, lambda: page_ids.extend(
+                            read_page(page_size, mode=mode, page=page, last_seen=last_seen)))
+
+                        if page in page_depths:
+                            times[(backend, mode, page)].append(elapsed)
+                            page_rows[(backend, mode, page)] = len(page_ids)
+
+                        if mode == 'keyset':
+                            # Koniec danych - głębszych stron nie ma
+                            if not page_ids:
+                                break
+                            last_seen = page_ids[-1]
+
+        results = []
+        for (backend, mode, page), values in times.items():
+            row = {
+                "backend": backend,
+                "mode": mode,
+                "page": page,
+                "page_size": page_size,
+                "rows": page_rows[(backend, mode, page)],
+            }
+            for stat, value in summarize(values).items():
+                row[f"latency_{stat}"] = value
+            results.append(row)
+
+        config = {
+            'page_size': page_size,
+            'page_depths': page_depths,
+            'num_iterations': num_iterations,
+            'warmup_iterations': warmup_iterations,
+            'backends': list(backends),
+            'modes': list(modes),
+            'index_mode': index_mode,
+            'restore_dataset': restore_dataset,
+            'baseline_rows': baseline_rows,
+            'data_source': data_source,
+            'seed': seed,
+        }
+        self.save_results(results, formats=result_formats, config=config, run_id=run_id,
+                          long_rows=pagination_to_long(results), kind='pagination',
+                          filename_prefix='pagination_results')
+
+        return results
+
+    # long_rows: wyniki testów innych niż run_tests, już w formacie długim magazynu (np. load_to_long);
+    # kind: rodzaj uruchomienia w magazynie (medbase.results_store.RUN_KINDS)
+    def save_results(self, results, formats=('store',), config=None, run_id=None, details=None, long_rows=None,
+                     kind='benchmark', filename_prefix='crud_performance_results'):
+        df = pd.DataFrame(results)
+         # Dodanie aktualnej daty do nazwy pliku
+        date_str = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        filename = f'{filename_prefix}_{date_str}'
+
+        if 'store' in formats:
+            ResultsStore(RESULTS_STORE_PATH).save_run(results, run_id=run_id, config=config,
+                                                      git_sha=current_git_sha(os.path.dirname(os.path.abspath(__file__))),
+                                                      details=details, long_rows=long_rows, kind=kind)
+        if 'csv' in formats:
+            df.to_csv(f'{filename}.csv', index=False)
+        if 'parquet' in formats:
+            df.to_parquet(f'{filename}.parquet', index=False)